@@ -1,5 +1,5 @@
 # Allows: python -m history_quiz [subcommand]
-from .main import cli
+from .cli import cli
 
 if __name__ == "__main__":
     raise SystemExit(cli())
\ No newline at end of file
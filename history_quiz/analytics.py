@@ -0,0 +1,312 @@
+"""Per-question item analysis for content authors, across all users.
+
+`history-quiz analytics <topic>` writes one row per live question:
+
+    attempts, users, correct   answers recorded, distinct users, correct ones
+    difficulty       share of attempts answered correctly (lower is harder)
+    discrimination   upper-lower index: difficulty among the top 27% of users
+                     by topic accuracy minus among the bottom 27%
+    point_biserial   correlation between an attempt being correct and the
+                     answering user's topic accuracy (uncorrected)
+    correct_option   1-based position of the correct answer (CSV a-d order)
+    choices          attempts whose chosen answer was recorded
+    option_N_rate    share of those choices that picked option N
+
+History is read from main.db and every history shard, archived ones too.
+Answers recorded before answer_history.answer_id existed count everywhere
+except the option rates.
+
+The numpy engine loads the columns into arrays in bulk and computes every
+metric with vectorised bincount/searchsorted passes. NumPy is optional; the
+sql engine computes the same metrics with SQLite aggregates and is the
+baseline for the analytics scenarios in dev/bench/suite.py. Parquet output
+needs pyarrow.
+"""
+from __future__ import annotations
+import math, os, sys, time
+from itertools import chain
+from .catalog import topic_path
+from .config import MAIN_DB_PATH, ensure_initialized
+from .utils.db_connection import get_connection
+
+GROUP_SHARE = 0.27  # upper and lower groups for the discrimination index
+BASE_COLUMNS = (
+    "question_id", "prompt", "attempts", "users", "correct", "difficulty",
+    "discrimination", "point_biserial", "correct_option", "choices",
+)
+
+
+def _history_paths() -> list[str]:
+    from .shards import shards
+
+    return [str(MAIN_DB_PATH)] + [p for _, p, _ in shards(include_archived=True) if os.path.exists(p)]
+
+
+def _answer_id_column(conn, schema: str = "main") -> str:
+    # archived shards are never migrated, so may predate answer_id
+    cols = {row[1] for row in conn.execute(f"PRAGMA {schema}.table_info(answer_history)")}
+    return "IFNULL(answer_id, -1)" if "answer_id" in cols else "-1"
+
+
+def _group_size(users: int) -> int:
+    return int(users * GROUP_SHARE)
+
+
+# ---------- numpy engine ----------
+
+def _load_history(np, topic: str):
+    """(user_id, question_id, was_correct, answer_id or -1) rows as an int64 array."""
+    parts = []
+    for path in _history_paths():
+        conn = get_connection(path)
+        try:
+            cur = conn.execute(
+                f"SELECT user_id, question_id, was_correct, {_answer_id_column(conn)} "
+                "FROM answer_history WHERE topic = ?",
+                (topic,),
+            )
+            parts.append(np.fromiter(chain.from_iterable(cur), dtype=np.int64).reshape(-1, 4))
+        finally:
+            conn.close()
+    return np.concatenate(parts) if parts else np.empty((0, 4), dtype=np.int64)
+
+
+def metrics_numpy(topic: str) -> dict:
+    import numpy as np
+
+    conn = get_connection(topic_path(topic).as_posix())
+    try:
+        rows = conn.execute("SELECT question_id, prompt FROM questions WHERE retired = 0 ORDER BY question_id").fetchall()
+        ans = np.fromiter(
+            chain.from_iterable(conn.execute("SELECT question_id, answer_id, is_correct FROM answers ORDER BY question_id, answer_id")),
+            dtype=np.int64,
+        ).reshape(-1, 3)
+    finally:
+        conn.close()
+    qids = np.array([r[0] for r in rows], dtype=np.int64)
+    n = len(qids)
+
+    def index_of(ids):
+        """Row index in qids for each id, and which ids are live questions."""
+        i = np.searchsorted(qids, ids)
+        i[i >= n] = 0
+        return i, (qids[i] == ids) if n else np.zeros(len(ids), dtype=bool)
+
+    # answer options: position within their question, in answer_id order
+    a_qi, a_live = index_of(ans[:, 0])
+    _, first, a_group = np.unique(ans[:, 0], return_index=True, return_inverse=True)
+    a_pos = np.arange(len(ans)) - first[a_group.ravel()]
+    k_opts = int(a_pos.max()) + 1 if len(ans) else 0
+    correct_option = np.zeros(n, dtype=np.int64)
+    is_ok = a_live & (ans[:, 2] == 1)
+    correct_option[a_qi[is_ok]] = a_pos[is_ok] + 1
+
+    h = _load_history(np, topic)
+    qi, live = index_of(h[:, 1])
+    h, qi = h[live], qi[live]
+    ok = h[:, 2].astype(np.float64)
+    uniq_users, uidx = np.unique(h[:, 0], return_inverse=True)
+    uidx = uidx.ravel()
+    n_users = len(uniq_users)
+
+    attempts = np.bincount(qi, minlength=n)
+    correct = np.bincount(qi, weights=ok, minlength=n)
+    users = np.bincount(np.unique(qi * max(n_users, 1) + uidx) // max(n_users, 1), minlength=n)
+    ability = np.bincount(uidx, weights=ok, minlength=n_users) / np.maximum(np.bincount(uidx, minlength=n_users), 1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        difficulty = correct / attempts
+        # point-biserial from per-question sums of the users' ability
+        x = ability[uidx]
+        sx = np.bincount(qi, weights=x, minlength=n)
+        sxx = np.bincount(qi, weights=x * x, minlength=n)
+        s1 = np.bincount(qi, weights=x * ok, minlength=n)
+        wrong = attempts - correct
+        sd = np.sqrt(np.maximum(sxx / attempts - (sx / attempts) ** 2, 0))
+        point_biserial = (s1 / correct - (sx - s1) / wrong) / sd * np.sqrt(difficulty * (1 - difficulty))
+        point_biserial[(correct == 0) | (wrong == 0) | ~(sd > 1e-12)] = np.nan
+
+        # upper-lower index over users ranked by ability, ties by user id
+        k = _group_size(n_users)
+        group = np.zeros(n_users, dtype=np.int8)
+        if k:
+            order = np.lexsort((uniq_users, ability))
+            group[order[:k]], group[order[-k:]] = -1, 1
+        g = group[uidx]
+
+        def p_in(sel):
+            return np.bincount(qi[sel], weights=ok[sel], minlength=n) / np.bincount(qi[sel], minlength=n)
+
+        discrimination = p_in(g == 1) - p_in(g == -1)
+
+    # distractor rates: chosen answer ids back to their option position
+    chose = h[:, 3] >= 0
+    by_id = np.argsort(ans[:, 1], kind="stable")
+    j = np.searchsorted(ans[by_id, 1], h[chose, 3])
+    j[j >= len(ans)] = 0
+    row = by_id[j] if len(ans) else j
+    known = (ans[row, 1] == h[chose, 3]) & (ans[row, 0] == h[chose, 1]) if len(ans) else np.zeros(len(j), dtype=bool)
+    counts = np.bincount(
+        qi[chose][known] * k_opts + a_pos[row[known]], minlength=n * k_opts
+    ).reshape(n, k_opts) if k_opts else np.zeros((n, 0))
+    choices = counts.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = counts / choices[:, None]
+
+    out = {
+        "question_id": qids, "prompt": [r[1] for r in rows], "attempts": attempts, "users": users,
+        "correct": correct.astype(np.int64), "difficulty": difficulty, "discrimination": discrimination,
+        "point_biserial": point_biserial, "correct_option": correct_option, "choices": choices,
+    }
+    for i in range(k_opts):
+        out[f"option_{i + 1}_rate"] = rates[:, i]
+    return out
+
+
+# ---------- SQL engine (baseline) ----------
+
+def metrics_sql(topic: str) -> dict:
+    conn = get_connection(topic_path(topic).as_posix())
+    try:
+        conn.execute(
+            "CREATE TEMP TABLE ev (user_id INTEGER, question_id INTEGER, ok INTEGER, answer_id INTEGER)"
+        )
+        # one file at a time: SQLite allows only ten attached databases, and
+        # monthly history can have more shards than that
+        for path in _history_paths():
+            conn.execute("ATTACH DATABASE ? AS h", (path,))
+            try:
+                conn.execute(
+                    f"INSERT INTO temp.ev SELECT user_id, question_id, was_correct, {_answer_id_column(conn, 'h')} "
+                    "FROM h.answer_history WHERE topic = ? "
+                    "AND question_id IN (SELECT question_id FROM main.questions WHERE retired = 0)",
+                    (topic,),
+                )
+                conn.commit()
+            finally:
+                conn.execute("DETACH DATABASE h")
+        conn.execute(
+            "CREATE TEMP TABLE ability AS SELECT user_id, AVG(ok) AS ability, "
+            "ROW_NUMBER() OVER (ORDER BY AVG(ok), user_id) AS rk FROM temp.ev GROUP BY user_id"
+        )
+        conn.execute("CREATE UNIQUE INDEX temp.idx_ability ON ability(user_id)")
+        n_users = conn.execute("SELECT COUNT(*) FROM temp.ability").fetchone()[0]
+        k = _group_size(n_users)
+        rows = conn.execute(
+            """
+            SELECT q.question_id, q.prompt, COUNT(e.ok), COUNT(DISTINCT e.user_id), TOTAL(e.ok),
+                   TOTAL(a.ability), TOTAL(a.ability * a.ability), TOTAL(a.ability * e.ok),
+                   TOTAL(CASE WHEN a.rk > :top THEN e.ok END), COUNT(CASE WHEN a.rk > :top THEN 1 END),
+                   TOTAL(CASE WHEN a.rk <= :k THEN e.ok END), COUNT(CASE WHEN a.rk <= :k THEN 1 END)
+            FROM questions q
+            LEFT JOIN temp.ev e ON e.question_id = q.question_id
+            LEFT JOIN temp.ability a ON a.user_id = e.user_id
+            WHERE q.retired = 0
+            GROUP BY q.question_id
+            ORDER BY q.question_id
+            """,
+            {"k": k, "top": n_users - k if k else n_users},
+        ).fetchall()
+        conn.execute(
+            "CREATE TEMP TABLE opt AS SELECT answer_id, question_id, is_correct, "
+            "ROW_NUMBER() OVER (PARTITION BY question_id ORDER BY answer_id) AS pos FROM answers"
+        )
+        conn.execute("CREATE UNIQUE INDEX temp.idx_opt ON opt(answer_id)")
+        k_opts = conn.execute("SELECT IFNULL(MAX(pos), 0) FROM temp.opt").fetchone()[0]
+        correct_option = dict(conn.execute("SELECT question_id, pos FROM temp.opt WHERE is_correct = 1"))
+        chosen: dict[int, list[int]] = {}
+        for qid, pos, n in conn.execute(
+            "SELECT o.question_id, o.pos, COUNT(*) FROM temp.ev e "
+            "JOIN temp.opt o ON o.answer_id = e.answer_id AND o.question_id = e.question_id "
+            "GROUP BY o.question_id, o.pos"
+        ):
+            chosen.setdefault(qid, [0] * k_opts)[pos - 1] = n
+    finally:
+        conn.close()
+
+    nan = float("nan")
+    out: dict[str, list] = {name: [] for name in BASE_COLUMNS}
+    rates = [[] for _ in range(k_opts)]
+    for qid, prompt, n, users, c, sx, sxx, s1, up_c, up_n, low_c, low_n in rows:
+        p = c / n if n else nan
+        sd = math.sqrt(max(sxx / n - (sx / n) ** 2, 0)) if n else 0.0
+        if 0 < c < n and sd > 1e-12:
+            pbis = (s1 / c - (sx - s1) / (n - c)) / sd * math.sqrt(p * (1 - p))
+        else:
+            pbis = nan
+        disc = up_c / up_n - low_c / low_n if up_n and low_n else nan
+        counts = chosen.get(qid, [0] * k_opts)
+        total = sum(counts)
+        for name, value in zip(BASE_COLUMNS, (
+            qid, prompt, n, users, int(c), p, disc, pbis, correct_option.get(qid, 0), total,
+        )):
+            out[name].append(value)
+        for i in range(k_opts):
+            rates[i].append(counts[i] / total if total else nan)
+    for i, col in enumerate(rates):
+        out[f"option_{i + 1}_rate"] = col
+    return out
+
+
+# ---------- output ----------
+
+def _cell(v):
+    v = v.item() if hasattr(v, "item") else v  # numpy scalars
+    if isinstance(v, float):
+        return "" if math.isnan(v) else f"{v:.6g}"
+    return v
+
+
+def write_csv(path: str, metrics: dict) -> None:
+    import csv
+
+    names = list(metrics)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(names)
+        for row in zip(*(metrics[name] for name in names)):
+            w.writerow([_cell(v) for v in row])
+
+
+def write_parquet(path: str, metrics: dict) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # from_pandas: NaN (no data) is written as null
+    pq.write_table(pa.table({k: pa.array(v, from_pandas=True) for k, v in metrics.items()}), path)
+
+
+def analytics(args) -> int:
+    ensure_initialized()
+    topic_db = topic_path(args.topic)
+    if not topic_db.is_file():
+        print(f"Error: Topic database not found: {topic_db}")
+        return 1
+    out = args.output or f"{args.topic}_analytics.{args.format or 'csv'}"
+    fmt = args.format or ("parquet" if out.endswith(".parquet") else "csv")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("Error: Parquet output needs pyarrow (pip install pyarrow), or use --format csv.")
+            return 2
+    engine = args.engine
+    if engine == "numpy":
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            print("NumPy is not installed (pip install numpy); using the SQL engine.", file=sys.stderr)
+            engine = "sql"
+
+    from .journal import flush
+
+    flush([args.topic])  # include answers still waiting in the write-behind journal
+    t0 = time.perf_counter()
+    metrics = metrics_numpy(args.topic) if engine == "numpy" else metrics_sql(args.topic)
+    elapsed = time.perf_counter() - t0
+    (write_parquet if fmt == "parquet" else write_csv)(out, metrics)
+    print(
+        f"Wrote {len(metrics['question_id'])} questions ({int(sum(metrics['attempts']))} answers) "
+        f"to {out} in {elapsed:.2f}s using the {engine} engine."
+    )
+    return 0
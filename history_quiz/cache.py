@@ -0,0 +1,64 @@
+from __future__ import annotations
+import os, threading
+from collections import OrderedDict
+from .config import QUESTION_CACHE_SIZE
+from .models import Question
+
+
+class QuestionCache:
+    """Read-through LRU of static question content, per topic DB.
+
+    Entries are keyed by the topic's content_version (bumped by the importer),
+    so a re-import invalidates them while stats writes do not. The bound is
+    the total number of cached questions across topics; least recently used
+    topics are dropped first.
+    """
+
+    def __init__(self, max_questions: int):
+        self.max_questions = max_questions
+        self._topics: OrderedDict[str, tuple[int, dict[int, Question]]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def lookup(self, path: str, version: int, qids) -> tuple[dict[int, Question], list[int]]:
+        """Return (cached questions among `qids`, ids that still need fetching)."""
+        key = os.path.abspath(path)
+        with self._lock:
+            entry = self._topics.get(key)
+            if entry is None or entry[0] != version:
+                if entry is not None:
+                    self._size -= len(entry[1])
+                entry = self._topics[key] = (version, {})
+            self._topics.move_to_end(key)
+            bank = entry[1]
+            found = {qid: bank[qid] for qid in qids if qid in bank}
+            missing = [qid for qid in qids if qid not in found]
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def store(self, path: str, version: int, questions) -> None:
+        key = os.path.abspath(path)
+        if self.max_questions <= 0:
+            return
+        with self._lock:
+            entry = self._topics.get(key)
+            if entry is None or entry[0] != version:
+                return  # invalidated while the page was being fetched
+            bank = entry[1]
+            for q in questions:
+                if q.question_id not in bank and len(bank) < self.max_questions:
+                    bank[q.question_id] = q
+                    self._size += 1
+            while self._size > self.max_questions and len(self._topics) > 1:
+                _, (_, evicted) = self._topics.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._topics.clear()
+            self._size = 0
+
+
+question_cache = QuestionCache(QUESTION_CACHE_SIZE)
@@ -0,0 +1,92 @@
+from __future__ import annotations
+import os, sqlite3
+from pathlib import Path
+from .config import MAIN_DB_PATH, TOPICS_DIR, ensure_initialized
+from .utils.db_connection import get_connection, pooled_connection
+
+
+def _in_topics_dir(path: Path) -> bool:
+    return path.resolve().parent == Path(TOPICS_DIR).resolve()
+
+
+def register_topic(path: str | Path) -> None:
+    """Record (or refresh) a topic DB in the catalog; DBs outside TOPICS_DIR are ignored."""
+    path = Path(path)
+    if not _in_topics_dir(path) or not path.is_file():
+        return
+    ensure_initialized()
+    # a private connection: a refresh may touch hundreds of DBs we won't quiz on
+    tconn = get_connection(path.as_posix())
+    try:
+        version = tconn.execute("PRAGMA user_version").fetchone()[0]
+        count = tconn.execute("SELECT COUNT(*) FROM questions WHERE retired = 0").fetchone()[0]
+    except sqlite3.OperationalError:
+        # topic DB from before questions could be retired
+        count = tconn.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+    finally:
+        tconn.close()
+    with pooled_connection(str(MAIN_DB_PATH)) as conn:
+        conn.execute(
+            "INSERT INTO topics (name, path, question_count, mtime, schema_version) VALUES (?,?,?,?,?) "
+            "ON CONFLICT(name) DO UPDATE SET path=excluded.path, question_count=excluded.question_count, "
+            "mtime=excluded.mtime, schema_version=excluded.schema_version, updated_at=CURRENT_TIMESTAMP",
+            (path.stem, path.as_posix(), count, os.stat(path).st_mtime, version),
+        )
+        conn.commit()
+
+
+def refresh_catalog() -> int:
+    """Rescan TOPICS_DIR, registering every topic DB and dropping missing ones."""
+    ensure_initialized()
+    found = sorted(Path(TOPICS_DIR).glob("*.db"))
+    for path in found:
+        register_topic(path)
+    with pooled_connection(str(MAIN_DB_PATH)) as conn:
+        names = [p.stem for p in found]
+        conn.execute(
+            f"DELETE FROM topics WHERE name NOT IN ({','.join('?' * len(names))})", names
+        )
+        conn.commit()
+    return len(found)
+
+
+def list_topics() -> list[tuple[str, str, int, float, int]]:
+    """Catalog rows (name, path, question_count, mtime, schema_version), by name.
+
+    An empty catalog (e.g. after upgrading from a version without one) is
+    filled by a single directory scan. Rows whose file has been deleted are
+    dropped from the catalog.
+    """
+    ensure_initialized()
+    query = "SELECT name, path, question_count, mtime, schema_version FROM topics ORDER BY name"
+    with pooled_connection(str(MAIN_DB_PATH)) as conn:
+        rows = conn.execute(query).fetchall()
+        if not rows and refresh_catalog():
+            rows = conn.execute(query).fetchall()
+        gone = {name for name, path, *_ in rows if not os.path.exists(path)}
+        if gone:
+            conn.executemany("DELETE FROM topics WHERE name = ?", ((name,) for name in gone))
+            conn.commit()
+            rows = [row for row in rows if row[0] not in gone]
+    return rows
+
+
+def topic_path(name: str) -> Path:
+    """Path of a topic DB from the catalog, defaulting to TOPICS_DIR/<name>.db."""
+    ensure_initialized()
+    with pooled_connection(str(MAIN_DB_PATH)) as conn:
+        row = conn.execute("SELECT path FROM topics WHERE name = ?", (name,)).fetchone()
+    return Path(row[0]) if row else Path(TOPICS_DIR) / f"{name}.db"
+
+
+def show_topics(args) -> int:
+    if args.refresh:
+        refresh_catalog()
+    rows = list_topics()
+    if not rows:
+        print(f"No topics found in {TOPICS_DIR}.")
+        return 0
+    width = max(len(r[0]) for r in rows)
+    for name, _path, count, _mtime, _version in rows:
+        print(f"  {name:<{width}}  {count:>7} questions")
+    return 0
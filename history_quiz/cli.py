@@ -0,0 +1,130 @@
+from __future__ import annotations
+import argparse, importlib
+
+# Kept free of the DB layer and the other app modules: building the parser,
+# --help and usage errors only cost argparse. Each subcommand imports its
+# module when it runs.
+
+QUIZ_MODES = ("weakest", "review")
+
+
+def _command(module: str, name: str):
+    def run(args):
+        return getattr(importlib.import_module(module, __package__), name)(args)
+
+    return run
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="history-quiz", description="History Quiz CLI")
+    p.add_argument("--profile", action="store_true", help="Print a per-phase time and SQL breakdown to stderr")
+    p.add_argument(
+        "--profile-format", choices=("text", "pstats", "trace"), default="text",
+        help="pstats also runs cProfile; trace also writes a Chrome trace JSON",
+    )
+    p.add_argument("--profile-out", metavar="PATH", help="File for the pstats or trace output")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    p_reg = sub.add_parser("register", help="Create a new user")
+    g = p_reg.add_mutually_exclusive_group(required=True)
+    g.add_argument("username", nargs="?", help="Username to register")
+    g.add_argument("--from-file", metavar="PATH", help="Register every username in a file, one per line ('-' for stdin)")
+    p_reg.set_defaults(func=_command(".main", "register_user"))
+
+    p_sum = sub.add_parser("summary", help="View your RAG summary")
+    p_sum.add_argument("username", help="Your username")
+    p_sum.set_defaults(func=_command(".main", "view_summary"))
+
+    p_rb = sub.add_parser("rebuild", help="Recompute RAG counters from scratch and check for drift")
+    p_rb.add_argument("--user", dest="username", help="Only rebuild this user")
+    p_rb.add_argument("--topic", help="Only rebuild this topic")
+    p_rb.set_defaults(func=_command(".main", "rebuild_stats"))
+
+    p_imp = sub.add_parser("import", help="Import topic questions from CSV files")
+    p_imp.add_argument("sources", nargs="+", help="CSV files, directories of CSVs, or glob patterns")
+    p_imp.add_argument("--topic", help="Topic name for a single CSV (default: file name without '_questions')")
+    p_imp.add_argument("--batch-size", type=int, help="Rows per executemany batch (default: 5000)")
+    p_imp.add_argument("--jobs", type=int, help="Parallel import processes (default: CPU count)")
+    p_imp.add_argument("--retire-missing", action="store_true", help="Retire questions no longer in the CSV")
+    p_imp.set_defaults(func=_command(".importer", "import_questions"))
+
+    p_top = sub.add_parser("topics", help="List available topics")
+    p_top.add_argument("--refresh", action="store_true", help="Rescan the topics folder first")
+    p_top.set_defaults(func=_command(".catalog", "show_topics"))
+
+    p_rep = sub.add_parser("report", help="View accuracy trends over recent days")
+    p_rep.add_argument("username", help="Your username")
+    p_rep.add_argument("--topic", help="Only report this topic")
+    p_rep.add_argument("--windows", default="7,30,90", help="Comma-separated window sizes in days")
+    p_rep.set_defaults(func=_command(".main", "view_report"))
+
+    p_srv = sub.add_parser("serve", help="Serve quizzes over HTTP/JSON")
+    p_srv.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    p_srv.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    p_srv.add_argument("--workers", type=int, default=8, help="Threads for SQLite reads")
+    p_srv.add_argument(
+        "--write-behind", action="store_true",
+        help="Journal finished quizzes and merge them into the stats in the background",
+    )
+    p_srv.set_defaults(func=_command(".server", "serve"))
+
+    p_cmp = sub.add_parser("compile", help="Build read-only content packs for faster quiz loading")
+    p_cmp.add_argument("topics", nargs="*", help="Topic names")
+    p_cmp.add_argument("--all", action="store_true", help="Compile every topic in the catalog")
+    p_cmp.set_defaults(func=_command(".pack", "compile_topics"))
+
+    p_an = sub.add_parser("analytics", help="Export per-question difficulty and distractor rates for a topic")
+    p_an.add_argument("topic", help="Topic name")
+    p_an.add_argument("--output", "-o", help="Output file (default: <topic>_analytics.csv)")
+    p_an.add_argument("--format", choices=("csv", "parquet"), help="Default: from the output extension, else csv")
+    p_an.add_argument(
+        "--engine", choices=("numpy", "sql"), default="numpy",
+        help="numpy: vectorised, needs NumPy (default); sql: SQLite aggregates",
+    )
+    p_an.set_defaults(func=_command(".analytics", "analytics"))
+
+    p_mig = sub.add_parser("migrate", help="Upgrade main.db and topic DBs to the current schema")
+    p_mig.add_argument("topics", nargs="*", help="Topic names")
+    p_mig.add_argument("--all", action="store_true", help="Migrate every topic in the catalog")
+    p_mig.add_argument("--jobs", type=int, help="Parallel migration processes (default: CPU count)")
+    p_mig.set_defaults(func=_command(".migrate", "migrate_topics"))
+
+    p_sh = sub.add_parser("shards", help="List answer-history shards")
+    p_sh.add_argument("--archive-before", metavar="YYYY-MM", help="First move shards for earlier months to the archive")
+    p_sh.set_defaults(func=_command(".shards", "show_shards"))
+
+    p_q = sub.add_parser("quiz", help="Take a quiz on a topic")
+    p_q.add_argument("username", help="Your username")
+    p_q.add_argument("topic", nargs="?", help="Topic name (filename without .db)")
+    t = p_q.add_mutually_exclusive_group()
+    t.add_argument("--topics", metavar="A,B,C", help="Mix questions from these topics, weakest first overall")
+    t.add_argument("--all-topics", action="store_true", help="Mix questions from every topic")
+    g = p_q.add_mutually_exclusive_group(required=True)
+    g.add_argument("--count", type=int, help="Number of questions to ask")
+    g.add_argument("--all", action="store_true", help="Ask all questions")
+    p_q.add_argument(
+        "--mode", choices=QUIZ_MODES, default="weakest",
+        help="weakest: lowest accuracy first; review: spaced-repetition items that are due",
+    )
+    p_q.set_defaults(func=_command(".main", "take_quiz"))
+    return p
+
+
+def cli(argv: list[str] | None = None) -> int:
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+
+    def run():
+        # apply results journaled by a write-behind run that did not exit cleanly
+        from .journal import recover
+
+        recover()
+        return args.func(args)
+
+    if args.profile:
+        from .utils.profiling import run_profiled
+
+        rc = run_profiled(run, args.profile_format, args.profile_out)
+    else:
+        rc = run()
+    return int(rc or 0)
@@ -17,23 +17,59 @@ def user_data_root() -> Path:
         base = os.getenv("XDG_DATA_HOME") or (Path.home() / ".local" / "share")
         return Path(base) / APP
 
-# Allow overrides via env vars, but use safe defaults
-DATA_ROOT = Path(os.getenv("HQ_DATA_ROOT", user_data_root()))
-MAIN_DB_PATH = Path(os.getenv("MAIN_DB_PATH", DATA_ROOT / "main.db"))
-TOPICS_DIR = Path(os.getenv("TOPICS_DIR", DATA_ROOT / "topics"))
+# Allow overrides via env vars, but use safe defaults. Paths are resolved on
+# first access (PEP 562) and nothing is created at import time; connections
+# create the folders they need.
+_PATHS = {
+    "DATA_ROOT": lambda: Path(os.getenv("HQ_DATA_ROOT") or user_data_root()),
+    "MAIN_DB_PATH": lambda: Path(os.getenv("MAIN_DB_PATH") or _path("DATA_ROOT") / "main.db"),
+    "TOPICS_DIR": lambda: Path(os.getenv("TOPICS_DIR") or _path("DATA_ROOT") / "topics"),
+    # write-behind journal (see journal.py)
+    "JOURNAL_DB_PATH": lambda: Path(os.getenv("HQ_JOURNAL_DB") or _path("DATA_ROOT") / "journal.db"),
+    # monthly answer-history shards (see shards.py)
+    "SHARDS_DIR": lambda: Path(os.getenv("HQ_SHARDS_DIR") or _path("DATA_ROOT") / "history"),
+}
 
-# Ensure folders exist at import time
-DATA_ROOT.mkdir(parents=True, exist_ok=True)
-TOPICS_DIR.mkdir(parents=True, exist_ok=True)
+# questions kept in the in-process content cache (0 disables it)
+QUESTION_CACHE_SIZE = int(os.getenv("HQ_QUESTION_CACHE", "100000"))
+# write-behind: finished quizzes go to a journal that a background thread
+# merges into the stats tables (see journal.py)
+WRITE_BEHIND = os.getenv("HQ_WRITE_BEHIND", "0") == "1"
+# "single" keeps answer history in main.db; "monthly" shards it (see shards.py)
+HISTORY_LAYOUT = os.getenv("HQ_HISTORY_LAYOUT", "single")
+
+
+def _path(name: str) -> Path:
+    if name not in globals():
+        globals()[name] = _PATHS[name]()  # later lookups are plain globals
+    return globals()[name]
+
+
+def __getattr__(name: str):
+    if name in _PATHS:
+        return _path(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_initialized = False
 
 
 def ensure_initialized() -> None:
-    """Create main.db if missing (idempotent)."""
-    if not MAIN_DB_PATH.exists():
-        try:
-            from .create_main_db import create_main_db
-            MAIN_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-            create_main_db(str(MAIN_DB_PATH))
-        except Exception:
-            # safe to ignore; CLI ops may still create later
-            pass
\ No newline at end of file
+    """Create or migrate main.db, once per process.
+
+    A warm main.db (user_version already current) costs one PRAGMA on the
+    pooled connection the command goes on to use, instead of a schema script.
+    """
+    global _initialized
+    if _initialized:
+        return
+    try:
+        from .create_main_db import migrate_main
+        from .utils.db_connection import pooled_connection
+
+        with pooled_connection(str(_path("MAIN_DB_PATH"))) as conn:
+            migrate_main(conn)
+        _initialized = True
+    except Exception:
+        # safe to ignore; CLI ops may still create later
+        pass
@@ -1,6 +1,8 @@
 from __future__ import annotations
 from .utils.db_connection import get_connection
+from .utils.migrations import latest, migrate, run_script
 
+# the version 1 tables; later changes are migration steps below
 SCHEMA = r"""
 -- users and aggregated stats live in main.db
 CREATE TABLE IF NOT EXISTS users (
@@ -18,6 +20,20 @@ CREATE TABLE IF NOT EXISTS answer_history (
   FOREIGN KEY(user_id) REFERENCES users(user_id)
 );
 
+CREATE INDEX IF NOT EXISTS idx_answer_history_user_topic
+  ON answer_history(user_id, topic, created_at);
+
+-- daily rollup of answer_history, kept current by update_stats so reports
+-- never scan raw history
+CREATE TABLE IF NOT EXISTS answer_daily (
+  user_id  INTEGER NOT NULL,
+  topic    TEXT NOT NULL,
+  day      TEXT NOT NULL,  -- YYYY-MM-DD (UTC, like created_at)
+  attempts INTEGER NOT NULL DEFAULT 0,
+  correct  INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY(user_id, topic, day)
+) WITHOUT ROWID;
+
 CREATE TABLE IF NOT EXISTS user_topic_stats (
   user_id    INTEGER NOT NULL,
   topic      TEXT NOT NULL,
@@ -28,13 +44,73 @@ CREATE TABLE IF NOT EXISTS user_topic_stats (
   PRIMARY KEY(user_id, topic),
   FOREIGN KEY(user_id) REFERENCES users(user_id)
 );
+
+-- directory of monthly answer-history shards (see shards.py)
+CREATE TABLE IF NOT EXISTS history_shards (
+  month      TEXT PRIMARY KEY,  -- YYYY-MM
+  path       TEXT NOT NULL,
+  archived   INTEGER NOT NULL DEFAULT 0 CHECK (archived IN (0,1)),
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- catalog of topic DBs so listing topics never scans TOPICS_DIR
+CREATE TABLE IF NOT EXISTS topics (
+  name           TEXT PRIMARY KEY,
+  path           TEXT NOT NULL,
+  question_count INTEGER NOT NULL DEFAULT 0,
+  mtime          REAL,
+  schema_version INTEGER NOT NULL DEFAULT 0,
+  updated_at     DATETIME DEFAULT CURRENT_TIMESTAMP
+);
 """
 
 
+def _v1_base(conn) -> None:
+    had_rollup = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='answer_daily'"
+    ).fetchone()
+    run_script(conn, SCHEMA)
+    if not had_rollup:
+        # first open after upgrading: roll up the history recorded so far
+        conn.execute(
+            "INSERT INTO answer_daily (user_id, topic, day, attempts, correct) "
+            "SELECT user_id, topic, date(created_at), COUNT(*), SUM(was_correct) "
+            "FROM answer_history GROUP BY user_id, topic, date(created_at)"
+        )
+
+
+def _v2_answer_choice(conn) -> None:
+    # the option picked, for distractor analysis; NULL on rows written before
+    conn.execute("ALTER TABLE answer_history ADD COLUMN answer_id INTEGER")
+
+
+def _v3_history_applied(conn) -> None:
+    # highest history_outbox entry of each topic copied into this file; also
+    # created in every history shard
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS history_applied (topic TEXT PRIMARY KEY, entry_id INTEGER NOT NULL)"
+    )
+
+
+# (version, description, step), applied in order by utils.migrations.migrate;
+# append new steps, never edit or reorder released ones
+MAIN_MIGRATIONS = (
+    (1, "users, history, rollups, shard directory and topic catalog", _v1_base),
+    (2, "answer_history.answer_id", _v2_answer_choice),
+    (3, "history_applied", _v3_history_applied),
+)
+
+MAIN_SCHEMA_VERSION = latest(MAIN_MIGRATIONS)
+
+
+def migrate_main(conn) -> tuple[int, int]:
+    """Apply pending main.db migrations; returns (version before, version after)."""
+    return migrate(conn, MAIN_MIGRATIONS)
+
+
 def create_main_db(path: str) -> None:
     conn = get_connection(path)
     try:
-        conn.executescript(SCHEMA)
-        conn.commit()
+        migrate_main(conn)
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
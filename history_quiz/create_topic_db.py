@@ -1,11 +1,16 @@
 from __future__ import annotations
+import time
 from .utils.db_connection import get_connection
+from .utils.migrations import latest, migrate, run_script
 
 SCHEMA = r"""
 -- per-topic database schema
 CREATE TABLE IF NOT EXISTS questions (
-  question_id INTEGER PRIMARY KEY,
-  prompt      TEXT NOT NULL
+  question_id  INTEGER PRIMARY KEY,
+  prompt       TEXT NOT NULL,
+  prompt_key   TEXT,     -- normalised prompt, identifies a question across re-imports
+  content_hash TEXT,     -- hash of normalised prompt + answers
+  retired      INTEGER NOT NULL DEFAULT 0 CHECK (retired IN (0,1))
 );
 
 CREATE TABLE IF NOT EXISTS answers (
@@ -24,13 +29,147 @@ CREATE TABLE IF NOT EXISTS question_stats (
   last_updated  DATETIME DEFAULT CURRENT_TIMESTAMP,
   PRIMARY KEY(user_id, question_id)
 );
+
+-- per-user count of questions in each RAG bucket, kept in step with question_stats
+CREATE TABLE IF NOT EXISTS rag_counters (
+  user_id INTEGER PRIMARY KEY,
+  green   INTEGER NOT NULL DEFAULT 0,
+  amber   INTEGER NOT NULL DEFAULT 0,
+  red     INTEGER NOT NULL DEFAULT 0
+);
+
+-- key/value metadata; content_version is bumped whenever questions or
+-- answers change so cached copies of them can be invalidated
+CREATE TABLE IF NOT EXISTS topic_meta (
+  key   TEXT PRIMARY KEY,
+  value INTEGER NOT NULL
+);
+
+-- spaced-repetition state per (user, question); see scheduler.py
+CREATE TABLE IF NOT EXISTS review_schedule (
+  user_id       INTEGER NOT NULL,
+  question_id   INTEGER NOT NULL,
+  repetitions   INTEGER NOT NULL DEFAULT 0,
+  interval_days REAL NOT NULL DEFAULT 0,
+  ease          REAL NOT NULL DEFAULT 2.5,
+  due_at        REAL NOT NULL,  -- unix time
+  PRIMARY KEY(user_id, question_id)
+) WITHOUT ROWID;
+"""
+
+# Indexes are kept separate from the tables so bulk loaders can build them
+# after loading.
+INDEXES = r"""
+CREATE INDEX IF NOT EXISTS idx_answers_question ON answers(question_id);
+-- covers the weakest-first selection join without touching the table
+CREATE INDEX IF NOT EXISTS idx_question_stats_cover
+  ON question_stats(user_id, question_id, correct_count, attempt_count);
+CREATE INDEX IF NOT EXISTS idx_review_due ON review_schedule(user_id, due_at);
+"""
+
+# answers whose answer_history rows are not yet in main.db or their shard;
+# written in the same transaction as the stats and emptied by main._drain_history
+OUTBOX = r"""
+CREATE TABLE IF NOT EXISTS history_outbox (
+  entry_id    INTEGER PRIMARY KEY AUTOINCREMENT,
+  user_id     INTEGER NOT NULL,
+  question_id INTEGER NOT NULL,
+  was_correct INTEGER NOT NULL,
+  answer_id   INTEGER,
+  answered_at REAL NOT NULL  -- unix time the session finished
+);
 """
 
+# columns added to questions after the first release, for ALTER TABLE on old DBs
+QUESTION_COLUMNS = (
+    ("prompt_key", "prompt_key TEXT"),
+    ("content_hash", "content_hash TEXT"),
+    ("retired", "retired INTEGER NOT NULL DEFAULT 0 CHECK (retired IN (0,1))"),
+)
+
+
+def _add_missing_columns(conn) -> None:
+    have = {row[1] for row in conn.execute("PRAGMA table_info(questions)")}
+    for name, ddl in QUESTION_COLUMNS:
+        if name not in have:
+            conn.execute(f"ALTER TABLE questions ADD COLUMN {ddl}")
+
+
+def _v1_base(conn) -> None:
+    # also brings any unversioned DB up to date, whichever release made it
+    run_script(conn, SCHEMA)
+    _add_missing_columns(conn)
+    run_script(conn, INDEXES)
+
+
+def _v2_history_outbox(conn) -> None:
+    run_script(conn, OUTBOX)
+    # entry ids must keep rising even if the topic DB is deleted and rebuilt,
+    # since history files remember the highest one they copied
+    conn.execute(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'history_outbox', ? "
+        "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'history_outbox')",
+        (time.time_ns() // 1000,),
+    )
+
+
+# (version, description, step), applied in order by utils.migrations.migrate;
+# append new steps, never edit or reorder released ones
+TOPIC_MIGRATIONS = (
+    (1, "tables, question columns and indexes", _v1_base),
+    (2, "history_outbox", _v2_history_outbox),
+)
+
+# stored in PRAGMA user_version and in the main.db topic catalog
+SCHEMA_VERSION = latest(TOPIC_MIGRATIONS)
+
+_upgraded: set[str] = set()
+
+
+def create_topic_db(path: str, indexes: bool = True) -> None:
+    """Create the topic tables and list the DB in the catalog.
+
+    Bulk loaders pass indexes=False, which leaves the DB unversioned, and call
+    migrate_topic() after loading to build the indexes and apply the rest.
+    """
+    from .catalog import register_topic
 
-def create_topic_db(path: str) -> None:
     conn = get_connection(path)
     try:
-        conn.executescript(SCHEMA)
-        conn.commit()
+        if indexes:
+            migrate(conn, TOPIC_MIGRATIONS)
+        else:
+            conn.executescript(SCHEMA)
+            _add_missing_columns(conn)
+            conn.commit()
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
+    register_topic(path)
+
+
+def migrate_topic(conn) -> tuple[int, int]:
+    """Apply pending topic migrations; returns (version before, version after)."""
+    return migrate(conn, TOPIC_MIGRATIONS)
+
+
+def ensure_topic_schema(conn, path: str) -> None:
+    """Migrate a topic DB on its first open in this process."""
+    if path in _upgraded:
+        return
+    migrate_topic(conn)
+    _upgraded.add(path)
+
+
+def content_version(conn) -> int:
+    row = conn.execute("SELECT value FROM topic_meta WHERE key = 'content_version'").fetchone()
+    return row[0] if row else 0
+
+
+def bump_content_version(conn) -> None:
+    # seeded from the clock rather than 1, so a topic DB that is deleted and
+    # rebuilt never repeats a version a running process has already cached
+    conn.execute(
+        "INSERT INTO topic_meta (key, value) VALUES ('content_version', ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = MAX(value + 1, excluded.value)",
+        (time.time_ns(),),
+    )
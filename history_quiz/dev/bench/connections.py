@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Count SQLite connections opened by one CLI quiz (register, quiz, summary)."""
+from __future__ import annotations
+import argparse, contextlib, csv, io, os, sys, tempfile, time
+from pathlib import Path
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--questions", type=int, default=200, help="Topic size")
+    p.add_argument("--count", type=int, default=20, help="Questions asked")
+    args = p.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # config reads these at import time, so set them first
+        os.environ["HQ_DATA_ROOT"] = tmp
+        os.environ.pop("MAIN_DB_PATH", None)
+        os.environ.pop("TOPICS_DIR", None)
+        sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+        from history_quiz.main import cli
+        from history_quiz.dev.scripts.import_questinos import import_csv
+        from history_quiz.utils.db_connection import connections_opened
+
+        seed = Path(tmp) / "bench.csv"
+        with seed.open("w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["question", "a", "b", "c", "d", "correct"])
+            for i in range(args.questions):
+                w.writerow([f"Question {i}?", "A", "B", "C", "D", 1 + i % 4])
+        with contextlib.redirect_stdout(io.StringIO()):
+            import_csv("bench", seed)
+            cli(["register", "bench_user"])
+
+        before = connections_opened()
+        t0 = time.perf_counter()
+        sys.stdin = io.StringIO("1\n" * args.count)
+        with contextlib.redirect_stdout(io.StringIO()):
+            cli(["quiz", "bench_user", "bench", "--count", str(args.count)])
+            cli(["summary", "bench_user"])
+        elapsed = time.perf_counter() - t0
+        sys.stdin = sys.__stdin__
+
+    print(f"connections opened per quiz+summary: {connections_opened() - before}")
+    print(f"elapsed: {elapsed * 1000:.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""Deterministic synthetic topics and user histories for benchmarks.
+
+The same seed and sizes always give the same rows. Everything is streamed
+through executemany in batches, so 10^7 history rows need little memory.
+History timestamps are spread over the days before today, so trailing-window
+reports see all of it.
+
+    python -m history_quiz.dev.bench.datagen --data-root /tmp/hq --questions 100000 --users 100 --answers 10000
+"""
+from __future__ import annotations
+import argparse, csv, os, random, time
+from array import array
+from itertools import islice
+from pathlib import Path
+
+# Run this from the folder that contains 'history_quiz'
+
+BATCH = 50_000
+WORDS = (
+    "king queen battle treaty empire war reform church parliament revolt "
+    "dynasty charter siege council crown plague trade colony republic army"
+).split()
+
+
+def _question(rng: random.Random, qid: int) -> tuple[str, list[str], int]:
+    """(prompt, four options, correct 1-4); prompts are unique per qid."""
+    words = " ".join(rng.choice(WORDS) for _ in range(6))
+    opts = [f"{rng.choice(WORDS).title()} {rng.randint(400, 1990)}" for _ in range(4)]
+    return f"Q{qid}: which {words}?", opts, rng.randint(1, 4)
+
+
+def questions(n: int, seed: int = 0):
+    """Yield (question_id, prompt, options, correct_idx) for ids 1..n."""
+    rng = random.Random(seed)
+    for qid in range(1, n + 1):
+        yield (qid, *_question(rng, qid))
+
+
+def generate_csv(path: Path, n: int, seed: int = 0) -> Path:
+    """An importer-ready CSV with `n` questions."""
+    with path.open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["question", "a", "b", "c", "d", "correct"])
+        for _, prompt, opts, correct in questions(n, seed):
+            w.writerow([prompt, *opts, correct])
+    return path
+
+
+def _batches(rows, size: int = BATCH):
+    it = iter(rows)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+def generate_topic(path: Path, n: int, seed: int = 0) -> Path:
+    """A topic DB with `n` questions (4n answers), as if it had been imported."""
+    from history_quiz.create_topic_db import bump_content_version, create_topic_db, migrate_topic
+    from history_quiz.importer import content_hash, prompt_key
+    from history_quiz.utils.db_connection import get_connection
+
+    create_topic_db(str(path), indexes=False)
+    conn = get_connection(str(path))
+    try:
+        conn.execute("PRAGMA synchronous=OFF")
+        for batch in _batches(questions(n, seed)):
+            conn.executemany(
+                "INSERT INTO questions (question_id, prompt, prompt_key, content_hash) VALUES (?,?,?,?)",
+                [(qid, p, prompt_key(p), content_hash(p, opts, c)) for qid, p, opts, c in batch],
+            )
+            conn.executemany(
+                "INSERT INTO answers (question_id, text, is_correct) VALUES (?,?,?)",
+                [(qid, text, int(i == c)) for qid, _, opts, c in batch for i, text in enumerate(opts, start=1)],
+            )
+        bump_content_version(conn)
+        conn.commit()
+        migrate_topic(conn)
+    finally:
+        conn.close()
+    from history_quiz.catalog import register_topic
+
+    register_topic(path)
+    return path
+
+
+def _options(conn, n_questions: int) -> tuple[array, array]:
+    """Per question id: its first answer_id and the offset of the correct one."""
+    first, correct = array("q", [0]) * (n_questions + 1), array("b", [0]) * (n_questions + 1)
+    for qid, aid, ok in conn.execute("SELECT question_id, answer_id, is_correct FROM answers ORDER BY answer_id"):
+        if not first[qid]:
+            first[qid] = aid
+        if ok:
+            correct[qid] = aid - first[qid]
+    return first, correct
+
+
+def _attempts(rng: random.Random, options, n_questions: int, answers: int, start: float, days: int):
+    """One user's (question_id, was_correct, answer_id, unix time), oldest first.
+
+    Questions are drawn with a skew towards low ids, and each user has their
+    own accuracy, so the RAG buckets and weakest-first ranking are realistic.
+    Wrong answers favour a question's first distractor over the later ones.
+    """
+    first, correct = options
+    skill = rng.uniform(0.3, 0.95)
+    step = days * 86400 / max(answers, 1)
+    for i in range(answers):
+        qid = min(n_questions, int(rng.paretovariate(1.2))) if rng.random() < 0.5 else rng.randint(1, n_questions)
+        ok = rng.random() < skill
+        pos = correct[qid]
+        if not ok:
+            pos = rng.choices([p for p in range(4) if p != pos], weights=(6, 3, 1))[0]
+        yield qid, int(ok), first[qid] + pos, start + i * step
+
+
+def generate_history(
+    topic_db: Path, topic: str, users: int, answers: int, seed: int = 0, days: int = 90
+) -> list[int]:
+    """Register `users` users and give each `answers` answers in the topic.
+
+    Writes answer_history and the answer_daily rollup in main.db, and
+    question_stats, rag_counters and user_topic_stats as update_stats would
+    have left them. Returns the new user ids.
+    """
+    from history_quiz.config import MAIN_DB_PATH, ensure_initialized
+    from history_quiz.create_topic_db import ensure_topic_schema
+    from history_quiz.main import _count_rag, _store_rag, _write_topic_summary
+    from history_quiz.utils.db_connection import attach, get_connection
+
+    ensure_initialized()
+    rng = random.Random(seed + 1)
+    start = time.time() - days * 86400
+    conn = get_connection(str(topic_db))
+    try:
+        ensure_topic_schema(conn, str(topic_db))
+        attach(conn, "hq", str(MAIN_DB_PATH))
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA hq.synchronous=OFF")
+        n_questions = conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+        options = _options(conn, n_questions)
+        first = conn.execute("SELECT COALESCE(MAX(user_id), 0) + 1 FROM hq.users").fetchone()[0]
+        uids = list(range(first, first + users))
+        conn.executemany(
+            "INSERT INTO hq.users (user_id, username) VALUES (?,?)", ((u, f"bench_user_{u}") for u in uids)
+        )
+        for uid in uids:
+            stats: dict[int, list[int]] = {}
+            daily: dict[str, list[int]] = {}
+            for batch in _batches(_attempts(rng, options, n_questions, answers, start, days)):
+                conn.executemany(
+                    "INSERT INTO hq.answer_history (user_id, topic, question_id, was_correct, answer_id, created_at) "
+                    "VALUES (?,?,?,?,?,datetime(?, 'unixepoch'))",
+                    [(uid, topic, qid, ok, aid, t) for qid, ok, aid, t in batch],
+                )
+                for qid, ok, _, t in batch:
+                    s = stats.setdefault(qid, [0, 0])
+                    s[0] += ok
+                    s[1] += 1
+                    d = daily.setdefault(time.strftime("%Y-%m-%d", time.gmtime(t)), [0, 0])
+                    d[0] += 1
+                    d[1] += ok
+            conn.executemany(
+                "INSERT INTO question_stats (user_id, question_id, correct_count, attempt_count) VALUES (?,?,?,?)",
+                [(uid, qid, cc, ac) for qid, (cc, ac) in stats.items()],
+            )
+            conn.executemany(
+                "INSERT INTO hq.answer_daily (user_id, topic, day, attempts, correct) VALUES (?,?,?,?,?)",
+                [(uid, topic, day, a, c) for day, (a, c) in daily.items()],
+            )
+            counts = _count_rag(conn, uid)
+            _store_rag(conn, uid, counts)
+            _write_topic_summary(conn, uid, topic, counts)
+            conn.commit()
+    finally:
+        conn.close()
+    return uids
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--data-root", required=True, help="HQ_DATA_ROOT to generate into")
+    p.add_argument("--topic", default="bench", help="Topic name")
+    p.add_argument("--questions", type=int, default=10_000, help="Questions in the topic")
+    p.add_argument("--users", type=int, default=10, help="Users with history")
+    p.add_argument("--answers", type=int, default=1_000, help="History rows per user")
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args(argv)
+
+    # config resolves these on first use, so set them before touching it
+    os.environ["HQ_DATA_ROOT"] = args.data_root
+    os.environ.pop("MAIN_DB_PATH", None)
+    os.environ.pop("TOPICS_DIR", None)
+    from history_quiz.config import TOPICS_DIR
+
+    t0 = time.perf_counter()
+    topic_db = generate_topic(Path(TOPICS_DIR) / f"{args.topic}.db", args.questions, args.seed)
+    t1 = time.perf_counter()
+    generate_history(topic_db, args.topic, args.users, args.answers, args.seed)
+    t2 = time.perf_counter()
+    print(f"{args.questions} questions in {t1 - t0:.1f}s; {args.users * args.answers} history rows in {t2 - t1:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
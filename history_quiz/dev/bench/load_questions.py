@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Time-to-first-question for load_questions against topic size.
+
+Each timed run starts with an empty question_cache, so best-of-N measures a
+cold load, as a freshly started quiz sees it, rather than cache hits.
+"""
+from __future__ import annotations
+import argparse, tempfile, time
+from pathlib import Path
+
+# Run this from the folder that contains 'history_quiz'
+from history_quiz.cache import question_cache
+from history_quiz.create_topic_db import create_topic_db
+from history_quiz.main import iter_questions, load_questions
+from history_quiz.utils.db_connection import get_connection
+
+
+def build_topic(path: Path, n: int) -> None:
+    create_topic_db(str(path))
+    conn = get_connection(str(path))
+    try:
+        conn.executemany(
+            "INSERT INTO questions (question_id, prompt) VALUES (?,?)",
+            ((qid, f"Question {qid}?") for qid in range(1, n + 1)),
+        )
+        conn.executemany(
+            "INSERT INTO answers (question_id, text, is_correct) VALUES (?,?,?)",
+            ((qid, f"Option {i}", int(i == 1)) for qid in range(1, n + 1) for i in range(1, 5)),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--sizes", default="1000,5000,20000,100000", help="Comma-separated topic sizes")
+    p.add_argument("--count", type=int, default=10, help="Questions per --count quiz")
+    p.add_argument("--repeat", type=int, default=3, help="Best-of-N timing")
+    args = p.parse_args(argv)
+
+    print(f"{'questions':>10}  {'--count':>10}  {'--all':>10}  {'--all first':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in (int(s) for s in args.sizes.split(",")):
+            db = Path(tmp) / f"bench_{n}.db"
+            build_topic(db, n)
+            timings = []
+            for fetch_all in (False, True):
+                best = float("inf")
+                for _ in range(args.repeat):
+                    question_cache.clear()
+                    t0 = time.perf_counter()
+                    load_questions(db.as_posix(), 1, args.count, fetch_all)
+                    best = min(best, time.perf_counter() - t0)
+                timings.append(best * 1000)
+            # first question off the paged stream, which is what a quiz waits for
+            best = float("inf")
+            for _ in range(args.repeat):
+                question_cache.clear()
+                t0 = time.perf_counter()
+                next(iter(iter_questions(db.as_posix(), 1, 0, True)))
+                best = min(best, time.perf_counter() - t0)
+            timings.append(best * 1000)
+            print(f"{n:>10}  {timings[0]:>8.1f}ms  {timings[1]:>8.1f}ms  {timings[2]:>10.1f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
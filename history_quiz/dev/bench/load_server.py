@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Load test for `history-quiz serve`: concurrent learners taking quizzes."""
+from __future__ import annotations
+import argparse, asyncio, json, random, shutil, tempfile, threading, time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+# Run this from the folder that contains 'history_quiz'
+
+
+async def _request(reader, writer, method: str, path: str, body: dict | None = None):
+    data = json.dumps(body).encode("utf-8") if body is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def _learner(host, port, username, topic, count, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+
+    async def timed(method, path, body=None):
+        t0 = time.perf_counter()
+        status, payload = await _request(reader, writer, method, path, body)
+        latencies.append(time.perf_counter() - t0)
+        if status >= 400:
+            errors.append(f"{path}: {status} {payload.get('error')}")
+        return payload
+
+    try:
+        await _request(reader, writer, "POST", "/register", {"username": username})  # 409 if seeded
+        while time.perf_counter() < deadline:
+            quiz = await timed("POST", "/quiz/start", {"username": username, "topic": topic, "count": count})
+            q = quiz.get("question")
+            while q is not None:
+                res = await timed("POST", "/quiz/answer", {"session_id": quiz["session_id"], "choice": random.randrange(len(q["answers"]))})
+                q = res.get("next")
+            await timed("POST", "/quiz/finish", {"session_id": quiz["session_id"]})
+    finally:
+        writer.close()
+
+
+def _start_local_server(workers: int, write_behind: bool) -> tuple[str, int]:
+    from history_quiz.server import serve_forever
+
+    ready = threading.Event()
+    bound: list[int] = []
+
+    def on_ready(server):
+        bound.append(server.sockets[0].getsockname()[1])
+        ready.set()
+
+    threading.Thread(target=lambda: asyncio.run(serve_forever("127.0.0.1", 0, workers, on_ready, write_behind)), daemon=True).start()
+    ready.wait()
+    return "127.0.0.1", bound[0]
+
+
+def _seed(topic: str, questions: int, users: int) -> None:
+    from history_quiz.config import TOPICS_DIR, ensure_initialized
+    from history_quiz.dev.bench.load_questions import build_topic
+    from history_quiz.main import create_user
+
+    ensure_initialized()
+    path = Path(TOPICS_DIR) / f"{topic}.db"
+    if not path.exists():
+        build_topic(path, questions)
+    for i in range(users):
+        create_user(f"bench{i}")
+
+
+def _pct(sorted_values: list[float], p: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))] * 1000
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--url", help="Target a running server (default: start one on a scratch HQ_DATA_ROOT)")
+    p.add_argument("--clients", type=int, default=32, help="Concurrent learners")
+    p.add_argument("--topics", type=int, default=4, help="Topics the learners are spread over")
+    p.add_argument("--questions", type=int, default=2000, help="Questions per generated topic")
+    p.add_argument("--count", type=int, default=10, help="Questions per quiz")
+    p.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    p.add_argument("--workers", type=int, default=8, help="Read threads for the in-process server")
+    p.add_argument("--write-behind", action="store_true", help="Journal stats in the in-process server")
+    args = p.parse_args(argv)
+
+    scratch = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        import os
+
+        scratch = tempfile.mkdtemp(prefix="hq-load-")
+        os.environ["HQ_DATA_ROOT"] = scratch  # before history_quiz.config is imported
+        for t in range(args.topics):
+            _seed(f"bench{t}", args.questions, args.clients)
+        host, port = _start_local_server(args.workers, args.write_behind)
+
+    latencies: list[float] = []
+    errors: list[str] = []
+
+    async def run():
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(*(
+            _learner(host, port, f"bench{i}", f"bench{i % args.topics}", args.count, deadline, latencies, errors)
+            for i in range(args.clients)
+        ))
+
+    t0 = time.perf_counter()
+    try:
+        asyncio.run(run())
+    finally:
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+    elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    print(f"clients={args.clients} topics={args.topics} duration={elapsed:.1f}s")
+    print(f"requests={len(latencies)}  {len(latencies) / elapsed:,.0f} req/s  errors={len(errors)}")
+    if latencies:
+        print(f"latency p50={_pct(latencies, 0.50):.1f}ms  p99={_pct(latencies, 0.99):.1f}ms  max={latencies[-1] * 1000:.1f}ms")
+    for e in errors[:5]:
+        print(f"  {e}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
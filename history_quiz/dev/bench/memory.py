@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Bytes per loaded question: nested tuples (before) vs Question/Answer objects.
+
+The Question figure is taken with question_cache disabled, so it counts only
+the questions handed to the caller; the cached copies are reported on their
+own line.
+"""
+from __future__ import annotations
+import argparse, gc, tempfile, tracemalloc
+from pathlib import Path
+
+# Run this from the folder that contains 'history_quiz'
+from history_quiz.dev.bench.load_questions import build_topic
+from history_quiz.cache import question_cache
+from history_quiz.main import load_questions
+from history_quiz.utils.db_connection import get_connection
+
+
+def load_as_tuples(path: str) -> list:
+    """The pre-Question representation: (qid, prompt, [(answer_id, text, is_correct), ...])."""
+    conn = get_connection(path)
+    try:
+        by_q: dict[int, list] = {}
+        for qid, aid, text, ok in conn.execute("SELECT question_id, answer_id, text, is_correct FROM answers"):
+            by_q.setdefault(qid, []).append((aid, text, ok))
+        return [(qid, prompt, by_q.get(qid, [])) for qid, prompt in conn.execute("SELECT question_id, prompt FROM questions")]
+    finally:
+        conn.close()
+
+
+def measure(fn) -> tuple[int, object]:
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, result
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--questions", type=int, default=100_000, help="Topic size")
+    args = p.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = (Path(tmp) / "bench.db").as_posix()
+        build_topic(Path(db), args.questions)
+        load_questions(db, 1, 1)  # open the pooled connection outside the measurement
+        before, rows = measure(lambda: load_as_tuples(db))
+        del rows
+        limit = question_cache.max_questions
+        question_cache.clear()
+        question_cache.max_questions = 0
+        try:
+            after, rows = measure(lambda: load_questions(db, 1, 0, fetch_all=True))
+        finally:
+            question_cache.max_questions = limit
+        n = len(rows)
+        del rows
+        question_cache.clear()
+        cached, rows = measure(lambda: load_questions(db, 1, 0, fetch_all=True))
+        del rows
+        question_cache.clear()
+
+    print(f"questions loaded: {n}")
+    print(f"tuples:           {before / n:8.1f} bytes/question")
+    print(f"Question objects: {after / n:8.1f} bytes/question")
+    print(f"  + question_cache: {(cached - after) / n:6.1f} bytes/question (cache limit {limit})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Cold start and RSS of an --all quiz, from the topic DB vs a compiled pack."""
+from __future__ import annotations
+import argparse, os, subprocess, sys, tempfile
+from pathlib import Path
+
+# Run this from the folder that contains 'history_quiz'
+from history_quiz.dev.bench.load_questions import build_topic
+from history_quiz.pack import compile_pack, pack_path
+
+# each measurement runs in a fresh interpreter so nothing is warm in-process
+PROBE = r"""
+import sys, time
+t0 = time.perf_counter()
+from history_quiz.main import iter_questions
+stream = iter(iter_questions(sys.argv[1], 1, 0, True))
+next(stream)
+first = time.perf_counter() - t0
+n = 1 + sum(1 for _ in zip(range(int(sys.argv[2])), stream))
+total = time.perf_counter() - t0
+# anonymous (private) memory; mapped pack pages are file-backed and shared
+status = dict(line.split(":", 1) for line in open("/proc/self/status"))
+print(first, total, n, status["RssAnon"].split()[0], status["RssFile"].split()[0])
+"""
+
+
+def probe(db: Path, walk: int) -> tuple[float, float, int, int, int]:
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE, db.as_posix(), str(walk)],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout.split()
+    return float(out[0]), float(out[1]), int(out[2]), int(out[3]), int(out[4])
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--questions", type=int, default=200_000, help="Questions in the generated topic")
+    p.add_argument("--walk", type=int, default=100_000, help="Questions to step through after the first")
+    args = p.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "bench.db"
+        build_topic(db, args.questions)
+        print(f"{args.questions} questions, walking {args.walk + 1}")
+        # "first" includes the weakest-first selection, which stays in SQLite
+        print(f"{'source':>6}  {'first':>9}  {'walk':>9}  {'private':>9}  {'file':>9}")
+        for label in ("db", "pack"):
+            if label == "pack":
+                compile_pack(db.as_posix())
+                print(f"  (pack is {os.path.getsize(pack_path(db.as_posix())) / 1e6:.1f} MB)")
+            first, total, n, anon_kb, file_kb = probe(db, args.walk)
+            print(
+                f"{label:>6}  {first * 1000:>7.0f}ms  {(total - first) * 1000:>7.0f}ms  "
+                f"{anon_kb / 1024:>7.0f}MB  {file_kb / 1024:>7.0f}MB"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""CLI startup regression check: -X importtime cost and wall time per command.
+
+Exits 1 when a command's median import time goes over its budget, so it can
+gate CI or a pre-commit hook.
+"""
+from __future__ import annotations
+import argparse, os, statistics, subprocess, sys, tempfile, time
+
+# Run this from the folder that contains 'history_quiz'
+
+# (label, argv, import budget in ms)
+SCENARIOS = (
+    ("--help", ["--help"], 20.0),
+    ("summary", ["summary", "bench_user"], 45.0),
+)
+
+
+def import_ms(stderr: str) -> float:
+    """Cumulative import time of the top-level history_quiz modules, in ms."""
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # nested imports are indented and already counted in their parent
+        if name.startswith(" history_quiz"):
+            total += int(cumulative)
+    return total / 1000
+
+
+def run(argv: list[str], env: dict, importtime: bool) -> tuple[float, str]:
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-m", "history_quiz", *argv]
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+    return time.perf_counter() - t0, proc.stderr
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--runs", type=int, default=15, help="Runs per command (medians are reported)")
+    p.add_argument("--scale", type=float, default=1.0, help="Multiply every budget, e.g. for slow CI machines")
+    args = p.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, HQ_DATA_ROOT=tmp, PYTHONPATH=os.getcwd())
+        for var in ("MAIN_DB_PATH", "TOPICS_DIR", "HQ_JOURNAL_DB", "HQ_SHARDS_DIR"):
+            env.pop(var, None)
+        # warm data root: main.db exists and is at the current schema version
+        run(["register", "bench_user"], env, False)
+
+        failed = False
+        print(f"{'command':>10}  {'imports':>9}  {'budget':>9}  {'wall':>9}")
+        for label, cmd, budget in SCENARIOS:
+            imports = statistics.median(import_ms(run(cmd, env, True)[1]) for _ in range(args.runs))
+            wall = statistics.median(run(cmd, env, False)[0] for _ in range(args.runs))
+            budget *= args.scale
+            over = imports > budget
+            failed |= over
+            print(
+                f"{label:>10}  {imports:>7.1f}ms  {budget:>7.1f}ms  {wall * 1000:>7.1f}ms"
+                + ("  OVER BUDGET" if over else "")
+            )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Scenario benchmarks for the quiz engine on generated data, with baselines.
+
+Builds a synthetic topic and user histories (see datagen.py) in a temporary
+data root, times each scenario, and writes the medians to a JSON file. With
+--baseline, a scenario whose median is more than --threshold slower than the
+baseline's fails the run (exit 1), so a saved results file can gate changes:
+
+    python -m history_quiz.dev.bench.suite --size medium --output base.json
+    python -m history_quiz.dev.bench.suite --size medium --baseline base.json
+"""
+from __future__ import annotations
+import argparse, contextlib, importlib.util, io, json, os, platform, statistics, sys, tempfile, time
+from pathlib import Path
+
+# Run this from the folder that contains 'history_quiz'
+
+# questions in the topic, users with history, history rows per user
+SIZES = {
+    "small": (1_000, 10, 1_000),
+    "medium": (100_000, 100, 10_000),
+    "large": (1_000_000, 1_000, 10_000),
+}
+SESSION = 20  # questions per quiz in the selection and answer scenarios
+
+
+def scenarios(tmp: Path, topic: str, topic_db: Path, uids: list[int], n_questions: int, seed: int):
+    """(name, setup or None, timed fn); each run gets a fresh setup()."""
+    from history_quiz.analytics import metrics_numpy, metrics_sql
+    from history_quiz.dev.bench.datagen import generate_csv
+    from history_quiz.importer import import_csv
+    from history_quiz.main import (
+        _get_user_id, get_summary, iter_questions, load_questions, update_stats, update_stats_many, view_report,
+    )
+
+    csv_path = generate_csv(tmp / "import.csv", n_questions, seed)
+    usernames = [f"bench_user_{u}" for u in uids]
+    runs = {"import": 0, "answer": 0}
+
+    def fresh_topic():
+        runs["import"] += 1
+        return (f"import_{runs['import']}",)
+
+    def imported():
+        # the first run imports; the timed ones find every row unchanged
+        if not runs.get("reimport"):
+            import_csv("reimport", csv_path)
+            runs["reimport"] = 1
+        return ()
+
+    def next_user():
+        runs["answer"] += 1
+        name = usernames[runs["answer"] % len(usernames)]
+        qids = [q.question_id for q in load_questions(topic_db.as_posix(), _get_user_id(name), SESSION)]
+        return name, [(qid, i % 3 != 0) for i, qid in enumerate(qids)]
+
+    # one session per bench user, recorded in a single batched call
+    cohort = [
+        (name, topic, 1 + (i * 7 + j) % n_questions, j % 3 != 0) for i, name in enumerate(usernames) for j in range(SESSION)
+    ]
+    report = argparse.Namespace(username=usernames[0], topic=None, windows="7,30,90")
+    analytics = metrics_numpy if importlib.util.find_spec("numpy") else metrics_sql  # NumPy is an optional extra
+    return (
+        ("import", fresh_topic, lambda name: import_csv(name, csv_path)),
+        ("reimport", imported, lambda: import_csv("reimport", csv_path)),
+        ("select", None, lambda: load_questions(topic_db.as_posix(), uids[0], SESSION)),
+        ("first_of_all", None, lambda: next(iter(iter_questions(topic_db.as_posix(), uids[0], 0, True)))),
+        ("answer", next_user, lambda name, results: update_stats(name, topic, results)),
+        ("answer_cohort", None, lambda: update_stats_many(cohort)),
+        ("summary", None, lambda: get_summary(uids[0])),
+        ("report", None, lambda: view_report(report)),
+        ("analytics", None, lambda: analytics(topic)),
+        ("analytics_sql", None, lambda: metrics_sql(topic)),
+    )
+
+
+def measure(setup, fn, runs: int) -> list[float]:
+    times = []
+    for _ in range(runs):
+        args = setup() if setup else ()
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            fn(*args)
+            times.append((time.perf_counter() - t0) * 1000)
+    return times
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_delta: float) -> list[str]:
+    """Names of scenarios whose median regressed by more than `threshold`
+    and by more than `min_delta` ms, so sub-millisecond jitter never fails."""
+    regressed = []
+    for name, r in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if (
+            base
+            and r["median_ms"] > base["median_ms"] * (1 + threshold)
+            and r["median_ms"] - base["median_ms"] > min_delta
+        ):
+            regressed.append(name)
+    return regressed
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--size", choices=SIZES, default="small", help="Preset data size (default: small)")
+    p.add_argument("--questions", type=int, help="Override the preset topic size")
+    p.add_argument("--users", type=int, help="Override the preset user count")
+    p.add_argument("--answers", type=int, help="Override the preset history rows per user")
+    p.add_argument("--seed", type=int, default=0, help="Generator seed")
+    p.add_argument("--runs", type=int, default=5, help="Timed runs per scenario (medians are compared)")
+    p.add_argument("--only", help="Comma-separated scenario names")
+    p.add_argument("--output", help="Write results JSON here")
+    p.add_argument("--baseline", help="Results JSON to compare against")
+    p.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown vs the baseline (default: 0.2 = 20%%)")
+    p.add_argument("--min-delta", type=float, default=1.0, help="Ignore slowdowns smaller than this many ms")
+    args = p.parse_args(argv)
+    n_questions, users, answers = SIZES[args.size]
+    n_questions = args.questions or n_questions
+    users = args.users or users
+    answers = args.answers or answers
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # config resolves these on first use, so set them before importing the app
+        os.environ["HQ_DATA_ROOT"] = tmp
+        for var in ("MAIN_DB_PATH", "TOPICS_DIR", "HQ_JOURNAL_DB", "HQ_SHARDS_DIR"):
+            os.environ.pop(var, None)
+        sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+        from history_quiz.config import TOPICS_DIR
+        from history_quiz.dev.bench.datagen import generate_history, generate_topic
+
+        t0 = time.perf_counter()
+        topic_db = generate_topic(Path(TOPICS_DIR) / "bench.db", n_questions, args.seed)
+        uids = generate_history(topic_db, "bench", users, answers, args.seed)
+        print(
+            f"generated {n_questions} questions, {users} users x {answers} answers "
+            f"in {time.perf_counter() - t0:.1f}s"
+        )
+
+        only = set(args.only.split(",")) if args.only else None
+        results = {
+            "meta": {
+                "size": args.size, "questions": n_questions, "users": users, "answers": answers,
+                "seed": args.seed, "runs": args.runs, "python": platform.python_version(),
+                "platform": platform.platform(), "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            },
+            "scenarios": {},
+        }
+        for name, setup, fn in scenarios(Path(tmp), "bench", topic_db, uids, n_questions, args.seed):
+            if only and name not in only:
+                continue
+            times = measure(setup, fn, args.runs)
+            results["scenarios"][name] = {
+                "median_ms": round(statistics.median(times), 3),
+                "min_ms": round(min(times), 3),
+                "max_ms": round(max(times), 3),
+            }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    regressed = compare(results, baseline, args.threshold, args.min_delta) if baseline else []
+    print(f"{'scenario':>18}  {'median':>10}  {'min':>10}" + (f"  {'baseline':>10}  {'change':>7}" if baseline else ""))
+    for name, r in results["scenarios"].items():
+        line = f"{name:>18}  {r['median_ms']:>8.2f}ms  {r['min_ms']:>8.2f}ms"
+        base = baseline and baseline.get("scenarios", {}).get(name)
+        if base:
+            change = r["median_ms"] / base["median_ms"] - 1 if base["median_ms"] else 0.0
+            line += f"  {base['median_ms']:>8.2f}ms  {change:>+6.0%}" + ("  REGRESSED" if name in regressed else "")
+        print(line)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+    if regressed:
+        print(f"{len(regressed)} scenario(s) slower than the baseline by more than {args.threshold:.0%}.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,51 +1,84 @@
 from __future__ import annotations
 import tkinter as tk
-from tkinter import ttk, messagebox
-from pathlib import Path
-from history_quiz.config import MAIN_DB_PATH, TOPICS_DIR, ensure_initialized
-from ..utils.db_connection import get_connection
-from ..main import load_questions, update_stats
+from concurrent.futures import Future, ThreadPoolExecutor
+from tkinter import filedialog, ttk, messagebox
+from history_quiz.config import ensure_initialized
+from ..utils import profiling
+from ..catalog import list_topics, topic_path
+from ..journal import recover
+from ..main import QUIZ_MODES, QuizSession, _get_user_id, create_user, get_summary, iter_questions, update_stats
 
 
-def _get_user_id(username: str) -> int | None:
-    if not username:
-        return None
-    conn = get_connection(str(MAIN_DB_PATH))
-    try:
-        row = conn.execute("SELECT user_id FROM users WHERE username=?", (username,)).fetchone()
-        return row[0] if row else None
-    finally:
-        conn.close()
+def _list_topics() -> list[str]:
+    return [name for name, *_ in list_topics()]
 
 
-def _list_topics() -> list[str]:
-    return [p.stem for p in Path(TOPICS_DIR).glob("*.db")]
+def _prepare_quiz(username: str, topic: str, count: int, fetch_all: bool, order: str):
+    """Runs on the worker thread; raises LookupError with a user-facing message."""
+    uid = _get_user_id(username)
+    if not uid:
+        raise LookupError(f"User '{username}' not found. Register first.")
+    topic_db = topic_path(topic)
+    if not topic_db.is_file():
+        raise LookupError(f"Topic DB not found: {topic_db}")
+    # the session pulls its first question here, off the Tk thread
+    session = QuizSession(username, topic, iter_questions(topic_db.as_posix(), uid, count, fetch_all, order))
+    return None if session.done else session
+
+
+def _load_summary(username: str):
+    uid = _get_user_id(username)
+    if not uid:
+        raise LookupError(f"User '{username}' not found.")
+    return get_summary(uid)
+
 
+class DbWorker:
+    """Runs DB work off the Tk main thread and delivers results back on it.
 
-class QuizSession:
-    def __init__(self, username: str, topic: str, questions):
-        self.username = username
-        self.topic = topic
-        self.questions = questions
-        self.index = 0
-        self.results: list[tuple[int, bool]] = []
+    A single worker thread keeps jobs in submission order, so a quiz started
+    right after another one always sees the previous session's stats.
+    """
 
-    @property
-    def done(self) -> bool:
-        return self.index >= len(self.questions)
+    POLL_MS = 50
 
-    def current(self):
-        return None if self.done else self.questions[self.index]
+    def __init__(self, root: tk.Misc):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-quiz-db")
+        self.pending: list[tuple[Future, object, object]] = []
+        self._polling = False
 
-    def answer(self, choice_index: int) -> bool:
-        qid, _prompt, answers = self.questions[self.index]
-        try:
-            ok = bool(answers[choice_index][2])
-        except Exception:
-            ok = False
-        self.results.append((qid, ok))
-        self.index += 1
-        return ok
+    def submit(self, fn, *args, on_done=None, on_error=None) -> Future:
+        fut = self.executor.submit(fn, *args)
+        self.pending.append((fut, on_done, on_error))
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.POLL_MS, self._poll)
+        return fut
+
+    def _poll(self):
+        pending, self.pending = self.pending, []
+        for fut, on_done, on_error in pending:
+            if not fut.done():
+                self.pending.append((fut, on_done, on_error))
+            elif fut.cancelled():
+                continue
+            elif fut.exception() is not None:
+                (on_error or self._show_error)(fut.exception())
+            elif on_done is not None:
+                on_done(fut.result())
+        if self.pending:
+            self.root.after(self.POLL_MS, self._poll)
+        else:
+            self._polling = False
+
+    @staticmethod
+    def _show_error(exc: BaseException):
+        messagebox.showerror("Error", str(exc))
+
+    def shutdown(self):
+        # let queued stats writes finish so closing the window loses nothing
+        self.executor.shutdown(wait=True)
 
 
 class App(tk.Tk):
@@ -56,11 +89,56 @@ class App(tk.Tk):
         self.resizable(False, False)
         ensure_initialized()
         self.session: QuizSession | None = None
+        self.worker = DbWorker(self)
+        # apply results journaled by a write-behind run that did not exit cleanly
+        self.worker.submit(recover)
+        self._load_token = 0
+        self._build_menu()
         self._build_home()
 
+    def destroy(self):
+        self.worker.shutdown()
+        super().destroy()
+
+    def _build_menu(self):
+        menubar = tk.Menu(self)
+        debug = tk.Menu(menubar, tearoff=False)
+        self.profiling_var = tk.BooleanVar(value=profiling.enabled())
+        debug.add_checkbutton(label="Profiling", variable=self.profiling_var, command=self._toggle_profiling)
+        debug.add_command(label="Show Profile", command=self._show_profile)
+        debug.add_command(label="Save Chrome Trace…", command=self._save_trace)
+        debug.add_command(label="Reset Profile", command=profiling.reset)
+        menubar.add_cascade(label="Debug", menu=debug)
+        self.config(menu=menubar)
+
+    def _toggle_profiling(self):
+        if self.profiling_var.get():
+            profiling.enable()
+        else:
+            profiling.disable()
+
+    def _show_profile(self):
+        win = tk.Toplevel(self)
+        win.title("Profile")
+        text = tk.Text(win, width=100, height=24, font="TkFixedFont")
+        text.insert("1.0", profiling.report() if profiling.enabled() else "Profiling is off (Debug → Profiling).")
+        text.config(state="disabled")
+        text.pack(fill="both", expand=True)
+
+    def _save_trace(self):
+        path = filedialog.asksaveasfilename(
+            parent=self, defaultextension=".json", initialfile="history-quiz-trace.json",
+            filetypes=[("Chrome trace", "*.json")],
+        )
+        if path:
+            n = profiling.write_chrome_trace(path)
+            messagebox.showinfo("Trace saved", f"Wrote {n} events to {path}.")
+
     def _clear(self):
+        # only the current screen; the menubar and any open profile windows stay
         for w in self.winfo_children():
-            w.destroy()
+            if not isinstance(w, (tk.Menu, tk.Toplevel)):
+                w.destroy()
 
     def _build_home(self):
         self._clear()
@@ -87,10 +165,14 @@ class App(tk.Tk):
         self.count_var = tk.IntVar(value=10)
         ttk.Spinbox(frm, from_=1, to=200, textvariable=self.count_var, width=7).grid(row=4, column=1, sticky="w")
 
-        ttk.Button(frm, text="Start Quiz", command=self._start_quiz).grid(row=5, column=0, pady=12, sticky="w")
-        ttk.Button(frm, text="View Summary", command=self._view_summary).grid(row=5, column=1, pady=12, sticky="w")
+        ttk.Label(frm, text="Order").grid(row=5, column=0, sticky="w")
+        self.order_var = tk.StringVar(value=QUIZ_MODES[0])
+        ttk.Combobox(frm, textvariable=self.order_var, values=QUIZ_MODES, state="readonly", width=10).grid(row=5, column=1, sticky="w")
 
-        for r in range(6):
+        ttk.Button(frm, text="Start Quiz", command=self._start_quiz).grid(row=6, column=0, pady=12, sticky="w")
+        ttk.Button(frm, text="View Summary", command=self._view_summary).grid(row=6, column=1, pady=12, sticky="w")
+
+        for r in range(7):
             frm.grid_rowconfigure(r, pad=6)
         for c in range(3):
             frm.grid_columnconfigure(c, pad=6)
@@ -100,60 +182,79 @@ class App(tk.Tk):
         if not username:
             messagebox.showerror("Error", "Enter a username.")
             return
-        conn = get_connection(str(MAIN_DB_PATH))
-        try:
-            if conn.execute("SELECT 1 FROM users WHERE username=?", (username,)).fetchone():
-                messagebox.showerror("Error", f"User '{username}' already exists.")
-                return
-            conn.execute("INSERT INTO users (username) VALUES (?)", (username,))
-            conn.commit()
-            messagebox.showinfo("Success", f"Registered '{username}'.")
-            self.topic_combo["values"] = _list_topics()
-        finally:
-            conn.close()
+        if not create_user(username):
+            messagebox.showerror("Error", f"User '{username}' already exists.")
+            return
+        messagebox.showinfo("Success", f"Registered '{username}'.")
+        self.topic_combo["values"] = _list_topics()
 
     def _start_quiz(self):
         username = self.username_var.get().strip()
         topic = self.topic_var.get().strip()
         mode = self.mode_var.get()
+        order = self.order_var.get()
         count = int(self.count_var.get())
         if not username:
             messagebox.showerror("Error", "Enter a username.")
             return
-        uid = _get_user_id(username)
-        if not uid:
-            messagebox.showerror("Error", f"User '{username}' not found. Register first.")
-            return
         if not topic:
             messagebox.showerror("Error", "Select a topic.")
             return
-        topic_db = (Path(TOPICS_DIR) / f"{topic}.db")
-        if not topic_db.is_file():
-            messagebox.showerror("Error", f"Topic DB not found: {topic_db}")
-            return
-        questions = load_questions(topic_db.as_posix(), uid, count, mode == "all")
-        if not questions:
-            messagebox.showerror("Error", f"No questions found in topic '{topic}'.")
-            return
-        if mode != "all":
-            questions = questions[: min(count, len(questions))]
-        self.session = QuizSession(username, topic, questions)
-        self._show_question()
+        self._load_token += 1
+        token = self._load_token
+
+        def loaded(session):
+            if token != self._load_token:
+                return  # cancelled while loading
+            if session is None:
+                self._build_home()
+                if order == "review":
+                    messagebox.showinfo("Review", f"Nothing in topic '{topic}' is due for review.")
+                else:
+                    messagebox.showerror("Error", f"No questions found in topic '{topic}'.")
+                return
+            self.session = session
+            self._show_question()
+
+        def failed(exc):
+            if token == self._load_token:
+                self._build_home()
+                messagebox.showerror("Error", str(exc))
+
+        fut = self.worker.submit(
+            _prepare_quiz, username, topic, count, mode == "all", order, on_done=loaded, on_error=failed
+        )
+        self._show_busy(f"Loading questions for '{topic}'…", fut)
+
+    def _show_busy(self, message: str, fut: Future):
+        self._clear()
+        frm = ttk.Frame(self, padding=16); frm.pack(fill="both", expand=True)
+        ttk.Label(frm, text=message).pack(anchor="w", pady=(0,8))
+        bar = ttk.Progressbar(frm, mode="indeterminate", length=300)
+        bar.pack(anchor="w", pady=(0,8))
+        bar.start(10)
+
+        def cancel():
+            self._load_token += 1
+            fut.cancel()  # only helps if it has not started; otherwise the result is dropped
+            self._build_home()
+
+        ttk.Button(frm, text="Cancel", command=cancel).pack(anchor="w")
 
     def _show_question(self, feedback: str | None = None):
         self._clear()
         if self.session is None or self.session.done:
             self._finish_quiz(); return
-        qid, prompt, answers = self.session.current()
+        q = self.session.current()
         frm = ttk.Frame(self, padding=16); frm.pack(fill="both", expand=True)
         if feedback:
             ttk.Label(frm, text=feedback).grid(row=0, column=0, columnspan=2, sticky="w", pady=(0,8))
-        ttk.Label(frm, text=prompt, wraplength=500).grid(row=1, column=0, columnspan=2, sticky="w")
+        ttk.Label(frm, text=q.prompt, wraplength=500).grid(row=1, column=0, columnspan=2, sticky="w")
         self.choice_var = tk.IntVar(value=-1)
-        for i, (_, text, _) in enumerate(answers, start=1):
-            ttk.Radiobutton(frm, text=f"{i}) {text}", variable=self.choice_var, value=i-1).grid(row=1+i, column=0, sticky="w")
-        ttk.Button(frm, text="Submit", command=self._submit_answer).grid(row=3+len(answers), column=0, pady=12, sticky="w")
-        ttk.Button(frm, text="Cancel", command=self._build_home).grid(row=3+len(answers), column=1, pady=12, sticky="e")
+        for i, a in enumerate(q.answers, start=1):
+            ttk.Radiobutton(frm, text=f"{i}) {a.text}", variable=self.choice_var, value=i-1).grid(row=1+i, column=0, sticky="w")
+        ttk.Button(frm, text="Submit", command=self._submit_answer).grid(row=3+len(q.answers), column=0, pady=12, sticky="w")
+        ttk.Button(frm, text="Cancel", command=self._build_home).grid(row=3+len(q.answers), column=1, pady=12, sticky="e")
 
     def _submit_answer(self):
         if self.session is None: return
@@ -167,33 +268,50 @@ class App(tk.Tk):
     def _finish_quiz(self):
         self._clear()
         if self.session is None: self._build_home(); return
-        correct = sum(1 for _, ok in self.session.results if ok)
+        correct = sum(1 for r in self.session.results if r[1])
         total = len(self.session.results)
-        try:
-            update_stats(self.session.username, self.session.topic, self.session.results)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to write stats: {e}")
         frm = ttk.Frame(self, padding=16); frm.pack(fill="both", expand=True)
         ttk.Label(frm, text=f"Quiz complete: {correct}/{total} correct.").pack(anchor="w", pady=(0,8))
+        status = ttk.Label(frm, text="Saving results…")
+        status.pack(anchor="w", pady=(0,8))
         ttk.Button(frm, text="Back to Home", command=self._build_home).pack(anchor="w")
 
+        def saved(_):
+            if status.winfo_exists():
+                status.config(text="Results saved.")
+
+        def failed(exc):
+            if status.winfo_exists():
+                status.config(text="Results not saved.")
+            messagebox.showerror("Error", f"Failed to write stats: {exc}")
+
+        self.worker.submit(
+            update_stats, self.session.username, self.session.topic, list(self.session.results),
+            on_done=saved, on_error=failed,
+        )
+        self.session = None
+
     def _view_summary(self):
         username = self.username_var.get().strip()
         if not username:
             messagebox.showerror("Error", "Enter a username first.")
             return
-        uid = _get_user_id(username)
-        if not uid:
-            messagebox.showerror("Error", f"User '{username}' not found.")
-            return
-        conn = get_connection(str(MAIN_DB_PATH))
-        try:
-            rows = conn.execute(
-                "SELECT topic, pct_green, pct_amber, pct_red, updated_at FROM user_topic_stats WHERE user_id=?",
-                (uid,),
-            ).fetchall()
-        finally:
-            conn.close()
+        self._load_token += 1
+        token = self._load_token
+
+        def loaded(rows):
+            if token == self._load_token:
+                self._show_summary(username, rows)
+
+        def failed(exc):
+            if token == self._load_token:
+                self._build_home()
+                messagebox.showerror("Error", str(exc))
+
+        fut = self.worker.submit(_load_summary, username, on_done=loaded, on_error=failed)
+        self._show_busy("Loading summary…", fut)
+
+    def _show_summary(self, username: str, rows):
         self._clear()
         frm = ttk.Frame(self, padding=16); frm.pack(fill="both", expand=True)
         ttk.Label(frm, text=f"RAG Summary for {username}").pack(anchor="w", pady=(0,8))
@@ -0,0 +1,334 @@
+from __future__ import annotations
+import csv, glob, hashlib, os, sys, time
+from pathlib import Path
+from typing import NamedTuple
+from .catalog import register_topic
+from .config import MAIN_DB_PATH, TOPICS_DIR, ensure_initialized
+from .create_topic_db import bump_content_version, create_topic_db, migrate_topic
+from .pack import compile_pack, pack_path
+from .utils.db_connection import attach, get_connection, select_in
+
+REQUIRED = ["question", "a", "b", "c", "d", "correct"]
+DEFAULT_BATCH_SIZE = 5000
+
+
+class ImportReport(NamedTuple):
+    topic: str
+    topic_db: Path
+    inserted: int
+    skipped: int
+    seconds: float
+    updated: int = 0
+    unchanged: int = 0
+    retired: int = 0
+
+    @property
+    def rows_per_sec(self) -> float:
+        rows = self.inserted + self.updated + self.unchanged + self.skipped
+        return rows / self.seconds if self.seconds else 0.0
+
+
+def _parse_row(row: dict):
+    """Return (prompt, options, correct_idx) or None for a malformed row."""
+    q = (row.get("question") or "").strip()
+    opts = [(row.get(k) or "").strip() for k in ("a", "b", "c", "d")]
+    try:
+        correct_idx = int(str(row.get("correct", "0")).strip())
+    except ValueError:
+        correct_idx = 0
+    if not q or any(not o for o in opts) or not (1 <= correct_idx <= 4):
+        return None
+    return q, opts, correct_idx
+
+
+def prompt_key(prompt: str) -> str:
+    """Whitespace- and case-insensitive identity of a question across imports."""
+    return " ".join(prompt.split()).casefold()
+
+
+def content_hash(prompt: str, opts: list[str], correct_idx: int) -> str:
+    parts = [" ".join(prompt.split()), *(" ".join(o.split()) for o in opts), str(correct_idx)]
+    return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def topic_for(csv_path: Path) -> str:
+    """Topic name for a CSV file: its stem without a trailing '_questions'."""
+    return csv_path.stem.removesuffix("_questions") or csv_path.stem
+
+
+def _existing_questions(conn) -> tuple[dict[str, tuple[int, str | None, int]], list[tuple[int, int]]]:
+    """Map prompt_key -> (question_id, content_hash, retired), plus (duplicate id, kept id) pairs."""
+    existing: dict[str, tuple[int, str | None, int]] = {}
+    duplicates = []
+    for qid, prompt, key, h, retired in conn.execute(
+        "SELECT question_id, prompt, prompt_key, content_hash, retired FROM questions ORDER BY question_id"
+    ):
+        key = key or prompt_key(prompt)
+        if key in existing:
+            # appended by an older, non-idempotent import; keep the first copy
+            if not retired:
+                duplicates.append((qid, existing[key][0]))
+            continue
+        existing[key] = (qid, h, retired)
+    return existing, duplicates
+
+
+def import_csv(
+    topic: str, csv_path: Path, batch_size: int = DEFAULT_BATCH_SIZE, retire_missing: bool = False
+) -> ImportReport:
+    """Upsert one CSV into <topic>.db, streaming it in executemany batches.
+
+    Rows are matched to existing questions by prompt_key. Unchanged rows
+    (same content_hash) are skipped and changed ones are updated in place, so
+    question ids and the stats attached to them survive a re-import.
+    """
+    t0 = time.perf_counter()
+    topic_db = Path(TOPICS_DIR) / f"{topic}.db"
+    create_topic_db(str(topic_db), indexes=False)
+
+    conn = get_connection(str(topic_db))
+    inserted = updated = unchanged = skipped = retired = 0
+    journal = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+    # trade crash safety for speed during the load; a WAL-mode DB may be open
+    # in a running app, and leaving WAL needs exclusive access, so keep it
+    if journal != "wal":
+        conn.execute("PRAGMA main.journal_mode=OFF")
+    conn.execute("PRAGMA main.synchronous=OFF")
+    try:
+        existing, duplicates = _existing_questions(conn)
+        seen: set[str] = set()
+        next_id = conn.execute("SELECT COALESCE(MAX(question_id), 0) + 1 FROM questions").fetchone()[0]
+        with csv_path.open("r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.DictReader(f)
+            if reader.fieldnames is None or any(h not in reader.fieldnames for h in REQUIRED):
+                raise SystemExit(f"CSV must have headers: {', '.join(REQUIRED)}")
+            new, changed = [], []
+            for row in reader:
+                parsed = _parse_row(row)
+                if parsed is None:
+                    skipped += 1
+                    continue
+                q, opts, correct_idx = parsed
+                key = prompt_key(q)
+                if key in seen:
+                    skipped += 1  # repeated within this CSV
+                    continue
+                seen.add(key)
+                h = content_hash(q, opts, correct_idx)
+                if key in existing:
+                    qid, old_hash, was_retired = existing[key]
+                    if old_hash == h and not was_retired:
+                        unchanged += 1
+                        continue
+                    changed.append((qid, q, key, h, opts, correct_idx))
+                else:
+                    new.append((next_id, q, key, h, opts, correct_idx))
+                    next_id += 1
+                if len(new) + len(changed) >= batch_size:
+                    _insert(conn, new); _update(conn, changed)
+                    inserted += len(new); updated += len(changed)
+                    new, changed = [], []
+            _insert(conn, new); _update(conn, changed)
+            inserted += len(new); updated += len(changed)
+
+        stale = [dup for dup, _ in duplicates]
+        merged_users = _merge_duplicates(conn, duplicates)
+        if retire_missing:
+            stale = stale + [qid for key, (qid, _, was_retired) in existing.items() if key not in seen and not was_retired]
+        conn.executemany("UPDATE questions SET retired = 1 WHERE question_id = ?", ((qid,) for qid in stale))
+        retired = len(stale)
+        if inserted or updated or retired:
+            bump_content_version(conn)
+        conn.commit()
+        migrate_topic(conn)  # builds the indexes on a new DB
+        if merged_users:
+            _refresh_summaries(conn, topic, merged_users)
+    finally:
+        # schema-qualified: main.db may be attached by now and must stay in WAL
+        try:
+            conn.execute(f"PRAGMA main.synchronous={synchronous}")
+            if journal != "wal":
+                conn.execute(f"PRAGMA main.journal_mode={journal}")
+        finally:
+            conn.close()
+    register_topic(topic_db)
+    if (inserted or updated or retired) and os.path.exists(pack_path(str(topic_db))):
+        try:
+            compile_pack(str(topic_db))  # keep an existing pack current
+        except OSError as e:
+            # the import has committed; the stale pack is skipped by version
+            print(f"Warning: could not update the pack for '{topic}' ({e}); "
+                  "questions are read from the DB until it is recompiled.", file=sys.stderr)
+    return ImportReport(
+        topic, topic_db, inserted, skipped, time.perf_counter() - t0, updated, unchanged, retired
+    )
+
+
+def _merge_duplicates(conn, pairs: list[tuple[int, int]]) -> list[int]:
+    """Fold the stats and review state of duplicate copies into the copies kept,
+    inside the caller's transaction, and recount the RAG counters of the users
+    affected; returns those users.
+
+    Attempts add up; where both copies have a review schedule the one due
+    first is kept.
+    """
+    if not pairs:
+        return []
+    conn.execute("CREATE TEMP TABLE dup_map (dup INTEGER PRIMARY KEY, keep INTEGER NOT NULL)")
+    try:
+        conn.executemany("INSERT INTO temp.dup_map (dup, keep) VALUES (?,?)", pairs)
+        users = [row[0] for row in conn.execute(
+            "SELECT DISTINCT user_id FROM question_stats WHERE question_id IN (SELECT dup FROM temp.dup_map)"
+        )]
+        conn.execute(
+            "INSERT INTO question_stats (user_id, question_id, correct_count, attempt_count) "
+            "SELECT s.user_id, m.keep, s.correct_count, s.attempt_count "
+            "FROM question_stats s JOIN temp.dup_map m ON m.dup = s.question_id WHERE 1 "
+            "ON CONFLICT(user_id, question_id) DO UPDATE SET "
+            "correct_count=correct_count+excluded.correct_count, "
+            "attempt_count=attempt_count+excluded.attempt_count, last_updated=CURRENT_TIMESTAMP"
+        )
+        conn.execute(
+            "INSERT INTO review_schedule (user_id, question_id, repetitions, interval_days, ease, due_at) "
+            "SELECT r.user_id, m.keep, r.repetitions, r.interval_days, r.ease, r.due_at "
+            "FROM review_schedule r JOIN temp.dup_map m ON m.dup = r.question_id WHERE 1 "
+            "ON CONFLICT(user_id, question_id) DO UPDATE SET repetitions=excluded.repetitions, "
+            "interval_days=excluded.interval_days, ease=excluded.ease, due_at=excluded.due_at "
+            "WHERE excluded.due_at < review_schedule.due_at"
+        )
+        for table in ("question_stats", "review_schedule"):
+            conn.execute(f"DELETE FROM {table} WHERE question_id IN (SELECT dup FROM temp.dup_map)")
+    finally:
+        conn.execute("DROP TABLE temp.dup_map")
+    if users:
+        from .main import _count_rag, _store_rag  # main is heavy; most imports never get here
+
+        for uid in users:
+            _store_rag(conn, uid, _count_rag(conn, uid))
+    return users
+
+
+def _refresh_summaries(conn, topic: str, users: list[int]) -> None:
+    """Rewrite the main.db summaries of `users` from the topic's RAG counters."""
+    from .main import _write_topic_summary
+
+    attach(conn, "hq", str(MAIN_DB_PATH))
+    for uid in users:
+        row = conn.execute("SELECT green, amber, red FROM rag_counters WHERE user_id=?", (uid,)).fetchone()
+        _write_topic_summary(conn, uid, topic, row or (0, 0, 0))
+    conn.commit()
+    conn.execute("DETACH DATABASE hq")
+
+
+def _insert(conn, rows: list) -> None:
+    if not rows:
+        return
+    conn.executemany(
+        "INSERT INTO questions (question_id, prompt, prompt_key, content_hash) VALUES (?,?,?,?)",
+        [(qid, q, key, h) for qid, q, key, h, _, _ in rows],
+    )
+    conn.executemany(
+        "INSERT INTO answers (question_id, text, is_correct) VALUES (?,?,?)",
+        [
+            (qid, text, int(i == correct_idx))
+            for qid, _, _, _, opts, correct_idx in rows
+            for i, text in enumerate(opts, start=1)
+        ],
+    )
+
+
+def _update(conn, rows: list) -> None:
+    """Rewrite changed questions in place, reusing their answer rows by position."""
+    if not rows:
+        return
+    conn.executemany(
+        "UPDATE questions SET prompt=?, prompt_key=?, content_hash=?, retired=0 WHERE question_id=?",
+        [(q, key, h, qid) for qid, q, key, h, _, _ in rows],
+    )
+    answer_ids: dict[int, list[int]] = {}
+    for qid, aid in select_in(
+        conn,
+        "SELECT question_id, answer_id FROM answers WHERE question_id IN ({}) ORDER BY question_id, answer_id",
+        [row[0] for row in rows],
+    ):
+        answer_ids.setdefault(qid, []).append(aid)
+    in_place, rebuilt = [], []
+    for qid, _, _, _, opts, correct_idx in rows:
+        ids = answer_ids.get(qid, [])
+        values = [(text, int(i == correct_idx)) for i, text in enumerate(opts, start=1)]
+        if len(ids) == len(values):
+            in_place.extend((text, ok, aid) for aid, (text, ok) in zip(ids, values))
+        else:
+            rebuilt.append(qid)
+            conn.execute("DELETE FROM answers WHERE question_id = ?", (qid,))
+            conn.executemany(
+                "INSERT INTO answers (question_id, text, is_correct) VALUES (?,?,?)",
+                [(qid, text, ok) for text, ok in values],
+            )
+    conn.executemany("UPDATE answers SET text=?, is_correct=? WHERE answer_id=?", in_place)
+
+
+def _import_job(job: tuple[str, str, int, bool]) -> ImportReport:
+    topic, path, batch_size, retire_missing = job
+    return import_csv(topic, Path(path), batch_size, retire_missing)
+
+
+def expand_sources(sources: list[str]) -> list[Path]:
+    """Files, directories (their *.csv) and glob patterns, de-duplicated in order."""
+    found: list[Path] = []
+    for src in sources:
+        p = Path(src)
+        if p.is_dir():
+            found.extend(sorted(p.glob("*.csv")))
+        elif p.is_file():
+            found.append(p)
+        else:
+            found.extend(Path(m) for m in sorted(glob.glob(src)))
+    unique: dict[Path, Path] = {}
+    for p in found:
+        unique.setdefault(p.resolve(), p)
+    return list(unique.values())
+
+
+def import_questions(args) -> int:
+    paths = expand_sources(args.sources)
+    if not paths:
+        print("No CSV files found.")
+        return 1
+    if args.topic and len(paths) != 1:
+        print("Error: --topic can only be used with a single CSV file.")
+        return 2
+    batch_size = args.batch_size or DEFAULT_BATCH_SIZE
+    jobs = [(args.topic or topic_for(p), str(p), batch_size, args.retire_missing) for p in paths]
+    if len({job[0] for job in jobs}) != len(jobs):
+        print("Error: two CSV files map to the same topic; import them separately.")
+        return 2
+
+    workers = max(1, min(args.jobs or os.cpu_count() or 1, len(jobs)))
+    t0 = time.perf_counter()
+    if workers == 1:
+        reports = [_import_job(job) for job in jobs]
+    else:
+        from concurrent.futures import ProcessPoolExecutor  # pulls in multiprocessing
+
+        # set up main.db and the topic DBs here, so the workers only ever
+        # open files that already exist and are already in their journal mode
+        ensure_initialized()
+        for topic, *_ in jobs:
+            create_topic_db(str(Path(TOPICS_DIR) / f"{topic}.db"), indexes=False)
+        # one topic DB per worker process, so no two writers share a file
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            reports = list(pool.map(_import_job, jobs))
+    elapsed = time.perf_counter() - t0
+    total = 0
+    for r in reports:
+        total += r.inserted
+        print(
+            f"Imported {r.inserted} new, {r.updated} updated, {r.unchanged} unchanged, "
+            f"{r.retired} retired questions into {r.topic_db} "
+            f"({r.skipped} malformed or repeated rows skipped, {r.rows_per_sec:,.0f} rows/sec)"
+        )
+    if len(jobs) > 1:
+        print(f"Imported {total} questions across {len(jobs)} topics in {elapsed:.2f}s using {workers} worker(s)")
+    return 0
@@ -0,0 +1,208 @@
+"""Write-behind journal for quiz results.
+
+Finished sessions are appended to journal.db (one short WAL commit) and a
+background thread merges them into the topic and main DBs in batches, one
+transaction per topic per batch. Each topic DB records the last entry it
+applied (topic_meta 'journal_applied') in the same transaction as the stats,
+so replaying the journal after a crash never counts an answer twice; the
+answer history follows through the topic's outbox (see main._drain_history).
+"""
+from __future__ import annotations
+import atexit, os, sys, threading, time
+from itertools import groupby
+from .config import JOURNAL_DB_PATH, MAIN_DB_PATH, TOPICS_DIR, WRITE_BEHIND
+from .create_topic_db import ensure_topic_schema
+from .utils.db_connection import attach, pooled_connection
+from .utils.migrations import migrate, run_script
+
+FLUSH_INTERVAL = float(os.getenv("HQ_FLUSH_INTERVAL", "2.0"))  # seconds between flushes
+FLUSH_BATCH = 5000  # pending answers that trigger an early flush; also rows per transaction
+
+SCHEMA = r"""
+CREATE TABLE IF NOT EXISTS pending (
+  entry_id    INTEGER PRIMARY KEY AUTOINCREMENT,
+  user_id     INTEGER NOT NULL,
+  topic       TEXT NOT NULL,
+  question_id INTEGER NOT NULL,
+  was_correct INTEGER NOT NULL,
+  answered_at REAL NOT NULL  -- unix time the session finished
+);
+CREATE INDEX IF NOT EXISTS idx_pending_topic ON pending(topic, entry_id);
+CREATE INDEX IF NOT EXISTS idx_pending_user ON pending(user_id, topic);
+"""
+
+JOURNAL_MIGRATIONS = (
+    (1, "pending answers", lambda conn: run_script(conn, SCHEMA)),
+    (2, "pending.answer_id", lambda conn: conn.execute("ALTER TABLE pending ADD COLUMN answer_id INTEGER")),
+)
+
+_enabled = WRITE_BEHIND
+_ready: set[str] = set()
+_flush_lock = threading.Lock()
+_wake = threading.Event()
+_stop = threading.Event()
+_flusher: threading.Thread | None = None
+_unflushed = 0
+
+
+def _journal(conn) -> None:
+    path = str(JOURNAL_DB_PATH)
+    if path in _ready:
+        return
+    migrate(conn, JOURNAL_MIGRATIONS)
+    # entry ids must keep rising even if journal.db is deleted and recreated,
+    # since topic DBs remember the highest one they applied
+    conn.execute(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT 'pending', ? "
+        "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'pending')",
+        (time.time_ns() // 1000,),
+    )
+    conn.commit()
+    _ready.add(path)
+
+
+def write_behind() -> bool:
+    return _enabled
+
+
+def enable() -> None:
+    """Switch this process to write-behind and start the flusher."""
+    global _enabled
+    _enabled = True
+    _start()
+
+
+def append(user_id: int, topic: str, session_results) -> None:
+    """Queue one finished session for the flusher."""
+    append_many([(user_id, topic, session_results)])
+
+
+def append_many(sessions) -> None:
+    """Queue (user_id, topic, session_results) sessions in one commit."""
+    global _unflushed
+    _start()
+    now = time.time()
+    rows = [
+        (user_id, topic, qid, int(ok), choice[0] if choice else None, now)
+        for user_id, topic, session_results in sessions
+        for qid, ok, *choice in session_results
+    ]
+    with pooled_connection(str(JOURNAL_DB_PATH)) as jconn:
+        _journal(jconn)
+        jconn.executemany(
+            "INSERT INTO pending (user_id, topic, question_id, was_correct, answer_id, answered_at) "
+            "VALUES (?,?,?,?,?,?)",
+            rows,
+        )
+        jconn.commit()
+    _unflushed += len(rows)
+    if _unflushed >= FLUSH_BATCH:
+        _wake.set()
+
+
+def flush(topics=None) -> int:
+    """Apply pending entries (for `topics`, or all) now; returns answers applied."""
+    global _unflushed
+    if not JOURNAL_DB_PATH.exists():
+        return 0
+    with _flush_lock:
+        _unflushed = 0
+        if topics is None:
+            with pooled_connection(str(JOURNAL_DB_PATH)) as jconn:
+                _journal(jconn)
+                topics = [row[0] for row in jconn.execute("SELECT DISTINCT topic FROM pending")]
+        return sum(_flush_topic(topic) for topic in topics)
+
+
+def flush_for(user_id: int, topic: str | None = None) -> None:
+    """Flush the topics `user_id` has pending answers in, so their reads see them."""
+    if not JOURNAL_DB_PATH.exists():
+        return
+    sql, params = "SELECT DISTINCT topic FROM pending WHERE user_id = ?", [user_id]
+    if topic is not None:
+        sql += " AND topic = ?"
+        params.append(topic)
+    with pooled_connection(str(JOURNAL_DB_PATH)) as jconn:
+        _journal(jconn)
+        topics = [row[0] for row in jconn.execute(sql, params)]
+    if topics:
+        flush(topics)
+
+
+def _flush_topic(topic: str) -> int:
+    from .main import _apply_results, _drain_history  # main imports this module
+
+    topic_db = os.path.join(str(TOPICS_DIR), f"{topic}.db")
+    if not os.path.exists(topic_db):
+        return 0  # topic removed; its entries stay queued in case it comes back
+    applied = 0
+    with pooled_connection(topic_db) as tconn:
+        ensure_topic_schema(tconn, topic_db)
+        attach(tconn, "hq", str(MAIN_DB_PATH))
+        attach(tconn, "jr", str(JOURNAL_DB_PATH))
+        while True:
+            # IMMEDIATE takes the write locks before the watermark is read, so
+            # two processes flushing the same topic apply each entry once
+            tconn.execute("BEGIN IMMEDIATE")
+            row = tconn.execute("SELECT value FROM topic_meta WHERE key = 'journal_applied'").fetchone()
+            mark = row[0] if row else 0
+            rows = tconn.execute(
+                "SELECT entry_id, user_id, question_id, was_correct, answered_at, answer_id FROM jr.pending "
+                "WHERE topic = ? AND entry_id > ? ORDER BY entry_id LIMIT ?",
+                (topic, mark, FLUSH_BATCH),
+            ).fetchall()
+            if rows:
+                # entries of one session are contiguous and share user and timestamp
+                for (uid, answered_at), session in groupby(rows, key=lambda r: (r[1], r[4])):
+                    _apply_results(tconn, uid, [(r[2], bool(r[3]), r[5]) for r in session], answered_at)
+                mark = rows[-1][0]
+                tconn.execute(
+                    "INSERT INTO topic_meta (key, value) VALUES ('journal_applied', ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                    (mark,),
+                )
+            tconn.execute("DELETE FROM jr.pending WHERE topic = ? AND entry_id <= ?", (topic, mark))
+            tconn.commit()
+            applied += len(rows)
+            if len(rows) < FLUSH_BATCH:
+                break
+        _drain_history(tconn, topic)
+    return applied
+
+
+def _run() -> None:
+    while not _stop.is_set():
+        _wake.wait(FLUSH_INTERVAL)
+        _wake.clear()
+        try:
+            flush()
+        except Exception as e:  # keep the thread alive; entries stay queued
+            print(f"history-quiz: journal flush failed: {e}", file=sys.stderr)
+
+
+def _start() -> None:
+    global _flusher
+    if _flusher is not None:
+        return
+    with _flush_lock:
+        if _flusher is not None:
+            return
+        _flusher = threading.Thread(target=_run, name="history-quiz-journal", daemon=True)
+        _flusher.start()
+    atexit.register(stop)
+
+
+def stop() -> None:
+    """Stop the flusher and apply whatever is still queued."""
+    global _flusher
+    if _flusher is not None:
+        _stop.set()
+        _wake.set()
+        _flusher.join()
+        _flusher = None
+    flush()
+
+
+def recover() -> int:
+    """Apply entries left behind by a process that exited without flushing."""
+    return flush()
@@ -1,40 +1,142 @@
 #!/usr/bin/env python3
 from __future__ import annotations
-import argparse, os, random, sys
-from history_quiz.utils.db_connection import get_connection
+import heapq, os, random, sys, threading, time
+from array import array
+from itertools import islice
+from history_quiz.utils.db_connection import attach, get_connection, pooled_connection, select_in
+from .cli import QUIZ_MODES, cli
 from .config import MAIN_DB_PATH, TOPICS_DIR, ensure_initialized
+from .catalog import list_topics, topic_path
+from . import journal
+from .cache import question_cache
+from .create_topic_db import content_version, ensure_topic_schema
+from .models import Answer, Question
+from .pack import open_pack
+from .scheduler import record_reviews, select_due
+from .shards import fan_out, history_schema, sharded
+from .utils import profiling
 from pathlib import Path
 
 GREEN_THRESHOLD = 0.8
 AMBER_THRESHOLD = 0.5
+PAGE_SIZE = 50  # questions fetched per page by QuestionStream
+MIX_WORKERS = 8  # topic DBs ranked at once for a mixed quiz
+OUTBOX_BATCH = 5000  # history_outbox rows copied per transaction
+USER_CACHE_SIZE = 10_000  # usernames whose user_id is kept in memory
+
+_user_ids: dict[str, int] = {}
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def _prefetch(fn, *args):
+    """Run fn on the shared page-prefetch pool, created on first use."""
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            from concurrent.futures import ThreadPoolExecutor  # costs ~15ms at startup
+
+            _prefetcher = ThreadPoolExecutor(max_workers=4, thread_name_prefix="history-quiz-prefetch")
+    return _prefetcher.submit(fn, *args)
 
 
 def _get_user_id(username: str):
-    conn = get_connection(str(MAIN_DB_PATH))
-    try:
-        row = conn.execute("SELECT user_id FROM users WHERE username = ?", (username,)).fetchone()
-        return row[0] if row else None
-    finally:
-        conn.close()
+    uid = _user_ids.get(username)
+    if uid is None:
+        with pooled_connection(str(MAIN_DB_PATH)) as conn:
+            row = conn.execute("SELECT user_id FROM users WHERE username = ?", (username,)).fetchone()
+        if row is None:
+            return None  # not cached: another process may register it later
+        uid = _remember_user(username, row[0])
+    return uid
+
+
+def _remember_user(username: str, uid: int) -> int:
+    # user ids never change and users are never deleted, so entries stay valid
+    if len(_user_ids) >= USER_CACHE_SIZE:
+        _user_ids.clear()
+    _user_ids[username] = uid
+    return uid
+
+
+def _get_user_ids(usernames) -> dict[str, int]:
+    """username -> user_id for those of `usernames` that exist, one query per chunk of misses."""
+    found = {name: _user_ids[name] for name in usernames if name in _user_ids}
+    missing = [name for name in dict.fromkeys(usernames) if name not in found]
+    if missing:
+        with pooled_connection(str(MAIN_DB_PATH)) as conn:
+            for name, uid in select_in(conn, "SELECT username, user_id FROM users WHERE username IN ({})", missing):
+                found[name] = _remember_user(name, uid)
+    return found
+
+
+def create_user(username: str) -> bool:
+    """Insert a user; False if the username is already taken."""
+    ensure_initialized()
+    with pooled_connection(str(MAIN_DB_PATH)) as conn:
+        cur = conn.execute("INSERT OR IGNORE INTO users (username) VALUES (?)", (username,))
+        conn.commit()
+    if not cur.rowcount:
+        return False
+    _remember_user(username, cur.lastrowid)
+    return True
+
+
+def create_users(usernames) -> int:
+    """Insert many users in one transaction, skipping taken names; returns how many were new."""
+    ensure_initialized()
+    with pooled_connection(str(MAIN_DB_PATH)) as conn:
+        before = conn.total_changes
+        conn.executemany("INSERT OR IGNORE INTO users (username) VALUES (?)", ((name,) for name in usernames))
+        conn.commit()
+        return conn.total_changes - before
+
+
+@profiling.timed("summary")
+def get_summary(uid: int) -> list[tuple]:
+    """Rows of (topic, pct_green, pct_amber, pct_red, updated_at) for a user."""
+    journal.flush_for(uid)  # include sessions still waiting in the journal
+    with pooled_connection(str(MAIN_DB_PATH)) as conn:
+        return conn.execute(
+            "SELECT topic, pct_green, pct_amber, pct_red, updated_at "
+            "FROM user_topic_stats WHERE user_id = ?",
+            (uid,),
+        ).fetchall()
 
 
 def register_user(args) -> int:
     ensure_initialized()
-    username = args.username.strip()
+    if args.from_file:
+        return _register_from_file(args.from_file)
+    username = (args.username or "").strip()
     if not username:
         print("Username is required.")
         return 2
-    conn = get_connection(str(MAIN_DB_PATH))
+    if not create_user(username):
+        print(f"Error: User '{username}' already exists.")
+        return 1
+    print(f"Registered new user: {username}")
+    return 0
+
+
+def _register_from_file(path: str) -> int:
+    """Register one username per line of `path` ('-' for stdin); blank and '#' lines are skipped."""
     try:
-        if conn.execute("SELECT 1 FROM users WHERE username=?", (username,)).fetchone():
-            print(f"Error: User '{username}' already exists.")
-            return 1
-        conn.execute("INSERT INTO users (username) VALUES (?)", (username,))
-        conn.commit()
-        print(f"Registered new user: {username}")
-        return 0
+        f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    except OSError as e:
+        print(f"Error: {e}")
+        return 2
+    try:
+        names = list(dict.fromkeys(n for line in f if (n := line.strip()) and not n.startswith("#")))
     finally:
-        conn.close()
+        if f is not sys.stdin:
+            f.close()
+    if not names:
+        print(f"No usernames found in {path}.")
+        return 2
+    added = create_users(names)
+    print(f"Registered {added} new users ({len(names) - added} already existed).")
+    return 0
 
 
 def view_summary(args) -> int:
@@ -44,200 +146,625 @@ def view_summary(args) -> int:
     if not uid:
         print(f"Error: User '{username}' not found. Please register first.")
         return 1
-    conn = get_connection(str(MAIN_DB_PATH))
+    rows = get_summary(uid)
+    if not rows:
+        print("No summary data found. Try taking a quiz first.")
+        return 0
+    print(f"RAG Summary for {username}:")
+    for topic, g, a, r, updated in rows:
+        print(f"  • {topic}:  G={g:.1f}%  A={a:.1f}%  R={r:.1f}%  (updated {updated})")
+    return 0
+
+
+def view_report(args) -> int:
+    """Per-topic accuracy over trailing windows, read from the daily rollup."""
+    ensure_initialized()
+    username = args.username
+    uid = _get_user_id(username)
+    if not uid:
+        print(f"Error: User '{username}' not found. Please register first.")
+        return 1
     try:
-        rows = conn.execute(
-            "SELECT topic, pct_green, pct_amber, pct_red, updated_at "
-            "FROM user_topic_stats WHERE user_id = ?",
-            (uid,),
-        ).fetchall()
-        if not rows:
-            print("No summary data found. Try taking a quiz first.")
-            return 0
-        print(f"RAG Summary for {username}:")
-        for topic, g, a, r, updated in rows:
-            print(f"  • {topic}:  G={g:.1f}%  A={a:.1f}%  R={r:.1f}%  (updated {updated})")
+        windows = sorted({int(w) for w in args.windows.split(",")})
+        if windows[0] < 1:
+            raise ValueError
+    except ValueError:
+        print("Error: --windows must be a comma-separated list of positive day counts.")
+        return 2
+    cols = ", ".join(
+        f"SUM(CASE WHEN day >= date('now', '-{w - 1} days') THEN attempts ELSE 0 END), "
+        f"SUM(CASE WHEN day >= date('now', '-{w - 1} days') THEN correct ELSE 0 END)"
+        for w in windows
+    )
+    journal.flush_for(uid)
+    sql = f"SELECT topic, {cols} FROM answer_daily WHERE user_id = ? AND day >= ?"
+    from datetime import datetime, timedelta, timezone
+
+    since = (datetime.now(timezone.utc) - timedelta(days=windows[-1] - 1)).strftime("%Y-%m-%d")
+    params: list = [uid, since]
+    if args.topic:
+        sql += " AND topic = ?"
+        params.append(args.topic)
+    # main.db plus any history shards; the same topic can appear in several
+    merged: dict[str, list[int]] = {}
+    with profiling.span("report query"):
+        results = fan_out(sql + " GROUP BY topic", params, since)
+    for topic, *sums in results:
+        acc = merged.setdefault(topic, [0] * len(sums))
+        for i, v in enumerate(sums):
+            acc[i] += v or 0
+    rows = [(topic, *merged[topic]) for topic in sorted(merged)]
+    if not rows:
+        print(f"No answers in the last {windows[-1]} days.")
         return 0
-    finally:
-        conn.close()
+    print(f"Accuracy report for {username}:")
+    for row in rows:
+        parts = []
+        for i, w in enumerate(windows):
+            attempts, correct = row[1 + 2 * i], row[2 + 2 * i]
+            pct = f"{correct / attempts * 100:5.1f}%" if attempts else "    -"
+            parts.append(f"{w}d={pct} ({attempts})")
+        print(f"  • {row[0]}:  " + "  ".join(parts))
+    return 0
 
 
 # ---------- Core quiz helpers used by CLI and GUI ----------
 
-def load_questions(topic_db_path: str, user_id: int, count: int, fetch_all: bool = False):
+@profiling.timed("fetch answers")
+def _fetch_answers(conn, qids) -> dict[int, list[Answer]]:
+    """Fetch answers for many questions at once, grouped by question_id."""
+    by_q: dict[int, list[Answer]] = {}
+    for qid, aid, text, ok in select_in(
+        conn, "SELECT question_id, answer_id, text, is_correct FROM answers WHERE question_id IN ({})", qids
+    ):
+        by_q.setdefault(qid, []).append(Answer(aid, text, ok))
+    return by_q
+
+
+class QuestionStream:
+    """Yields Question objects in selection order, a page at a time.
+
+    Only the ordered question ids (8 bytes each) are held for the whole
+    session. Prompts and answers are fetched per page, and the next page is
+    prefetched on a background thread while the current one is answered.
+    Pages come from the topic's compiled pack when it matches the DB's
+    content version, otherwise through question_cache, so only questions not
+    seen since the topic's last import touch the DB.
+    """
+
+    def __init__(self, topic_db_path: str, qids, page_size: int = PAGE_SIZE, version: int = 0):
+        self.topic_db_path = topic_db_path
+        self.qids = array("q", qids)
+        self.page_size = max(1, page_size)
+        self.version = version
+
+    def __len__(self) -> int:
+        return len(self.qids)
+
+    def __iter__(self):
+        fut = None
+        for start in range(0, len(self.qids), self.page_size):
+            page = fut.result() if fut is not None else self._fetch_page(start)
+            nxt = start + self.page_size
+            fut = _prefetch(self._fetch_page, nxt) if nxt < len(self.qids) else None
+            yield from page
+
+    def _lookup(self, ids: set) -> dict[int, Question]:
+        """Shared (unshuffled) questions for `ids`; ids deleted since selection are absent."""
+        pack = open_pack(self.topic_db_path, self.version)
+        if pack is not None:
+            # a current compiled pack is mapped and shared, so it needs no cache
+            found, missing = pack.lookup(ids)
+        else:
+            found, missing = question_cache.lookup(self.topic_db_path, self.version, ids)
+        if missing:
+            profiling.count("questions read from db", len(missing))
+            with pooled_connection(self.topic_db_path) as tconn:
+                rows = list(
+                    select_in(tconn, "SELECT question_id, prompt FROM questions WHERE question_id IN ({})", missing)
+                )
+                by_q = _fetch_answers(tconn, missing)
+            fetched = [Question(qid, prompt, by_q.get(qid, [])) for qid, prompt in rows]
+            question_cache.store(self.topic_db_path, self.version, fetched)
+            found.update((q.question_id, q) for q in fetched)
+        return found
+
+    @profiling.timed("fetch page")
+    def _fetch_page(self, start: int) -> list:
+        ids = self.qids[start : start + self.page_size]
+        found = self._lookup(set(ids))
+        page = []
+        for qid in ids:
+            q = found.get(qid)
+            if q is not None:  # skip anything deleted since selection
+                # cached questions are shared, so shuffle a copy of the answers
+                page.append(Question(qid, q.prompt, random.sample(q.answers, len(q.answers))))
+        return page
+
+
+class MixedQuestionStream(QuestionStream):
+    """A QuestionStream over several topics, in one cross-topic order.
+
+    Each page is split by topic and looked up through that topic's own
+    stream (pack, cache, then DB); the yielded Questions carry their topic.
+    """
+
+    def __init__(self, sources: list[QuestionStream], topics: list[str], picked, page_size: int = PAGE_SIZE):
+        self.sources = sources
+        self.topics = topics
+        self.which = array("H", (i for i, _ in picked))  # index into sources
+        self.qids = array("q", (qid for _, qid in picked))
+        self.page_size = max(1, page_size)
+
+    @profiling.timed("fetch page")
+    def _fetch_page(self, start: int) -> list:
+        end = start + self.page_size
+        wanted: dict[int, set] = {}
+        for i, qid in zip(self.which[start:end], self.qids[start:end]):
+            wanted.setdefault(i, set()).add(qid)
+        found = {i: self.sources[i]._lookup(qids) for i, qids in wanted.items()}
+        page = []
+        for i, qid in zip(self.which[start:end], self.qids[start:end]):
+            q = found[i].get(qid)
+            if q is not None:
+                page.append(Question(qid, q.prompt, random.sample(q.answers, len(q.answers)), self.topics[i]))
+        return page
+
+
+class QuizSession:
+    """Walks a question iterable (usually a QuestionStream) one question ahead."""
+
+    def __init__(self, username: str, topic: str, questions):
+        self.username = username
+        self.topic = topic
+        self.total = len(questions)
+        self._questions = iter(questions)
+        self._current = next(self._questions, None)
+        self.index = 0
+        self.results: list[tuple[int, bool, int | None]] = []  # (question_id, ok, answer_id)
+
+    @property
+    def done(self) -> bool:
+        return self._current is None
+
+    def current(self):
+        return self._current
+
+    def answer(self, choice_index: int) -> bool:
+        q = self._current
+        ok = q.is_correct(choice_index)
+        self.results.append((q.question_id, ok, q.choice_id(choice_index)))
+        self.index += 1
+        self._current = next(self._questions, None)
+        return ok
+
+
+def iter_questions(
+    topic_db_path: str, user_id: int, count: int, fetch_all: bool = False,
+    mode: str = "weakest", page_size: int = PAGE_SIZE,
+) -> QuestionStream:
+    """Select questions like load_questions, but return a lazily paged stream."""
+    with pooled_connection(topic_db_path) as tconn:
+        ensure_topic_schema(tconn, topic_db_path)
+        with profiling.span("select"):
+            if mode == "review":
+                qids = select_due(tconn, user_id, -1 if fetch_all else max(0, count))
+            else:
+                qids = _select_weakest(tconn, user_id, count, fetch_all)
+        version = content_version(tconn)
+    return QuestionStream(topic_db_path, qids, page_size, version)
+
+
+def load_questions(
+    topic_db_path: str, user_id: int, count: int, fetch_all: bool = False, mode: str = "weakest"
+):
     """
-    Returns list[(question_id, prompt, answers)] where answers is
-    list[(answer_id, text, is_correct)]. Ordered by lowest performance first.
+    Returns list[Question]; each Question unpacks as (question_id, prompt,
+    answers) and each Answer as (answer_id, text, is_correct). In "weakest" mode questions are
+    ordered by lowest performance first; in "review" mode only questions due
+    for spaced-repetition review (then unseen ones) are returned.
+    """
+    return list(iter_questions(topic_db_path, user_id, count, fetch_all, mode))
+
+
+# (question_id, accuracy) weakest first; SQLite keeps only the best LIMIT
+# rows while sorting (LIMIT -1 = all)
+WEAKEST_SQL = """
+    SELECT q.question_id,
+           CASE WHEN s.attempt_count > 0
+                THEN CAST(s.correct_count AS REAL) / s.attempt_count
+                ELSE 0.0 END AS score
+    FROM questions q
+    LEFT JOIN question_stats s
+      ON s.user_id = ? AND s.question_id = q.question_id
+    WHERE q.retired = 0
+    ORDER BY score, q.question_id
+    LIMIT ?
+"""
+
+
+def _wrap(selected: list, count: int, fetch_all: bool) -> list:
+    if not fetch_all and selected and len(selected) < count:
+        # fewer questions than asked for: wrap around the ranked list
+        selected = (selected * (count // len(selected) + 1))[:count]
+    return selected
+
+
+@profiling.timed("select weakest")
+def _select_weakest(tconn, user_id: int, count: int, fetch_all: bool) -> list[int]:
+    rows = tconn.execute(WEAKEST_SQL, (user_id, -1 if fetch_all else max(0, count)))
+    return _wrap([row[0] for row in rows], count, fetch_all)
+
+
+def _weakest_candidates(topic_db_path: str, user_id: int, limit: int) -> tuple[list[tuple[float, int]], int]:
+    """(score, question_id) pairs weakest first, and the content version, for one topic.
+
+    Runs on a fan-out thread with its own short-lived connection, so a mixed
+    quiz opens each topic DB once and leaves nothing in the pool.
     """
-    tconn = get_connection(topic_db_path)
+    conn = get_connection(topic_db_path)
     try:
-        cur = tconn.execute(
-            """
-            SELECT q.question_id, q.prompt,
-                   COALESCE(s.correct_count, 0) AS cc,
-                   COALESCE(s.attempt_count, 0) AS ac
-            FROM questions q
-            LEFT JOIN question_stats s
-              ON q.question_id = s.question_id AND s.user_id = ?
-            """,
-            (user_id,),
-        )
-        qlist = []
-        for qid, prompt, cc, ac in cur.fetchall():
-            ratio = (cc / ac) if ac > 0 else 0.0
-            qlist.append((qid, prompt, ratio))
-        qlist.sort(key=lambda x: (x[2], x[0]))
-
-        selected = qlist if fetch_all else (qlist * ((max(1, count) // max(1, len(qlist))) + 1))[: max(0, count)]
-        questions = []
-        for qid, prompt, _ in selected:
-            answers = tconn.execute(
-                "SELECT answer_id, text, is_correct FROM answers WHERE question_id = ?",
-                (qid,),
-            ).fetchall()
-            random.shuffle(answers)
-            questions.append((qid, prompt, answers))
-        return questions
+        ensure_topic_schema(conn, topic_db_path)
+        rows = [(score, qid) for qid, score in conn.execute(WEAKEST_SQL, (user_id, limit))]
+        return rows, content_version(conn)
     finally:
-        tconn.close()
+        conn.close()
+
+
+def iter_mixed_questions(
+    topics: list[str], user_id: int, count: int, fetch_all: bool = False, page_size: int = PAGE_SIZE,
+) -> MixedQuestionStream:
+    """Weakest-first questions drawn from several topics, ranked together.
+
+    Each topic DB returns its own weakest `count` candidates, in parallel;
+    no topic can place more than that in the global top `count`, so a heap
+    merge of the per-topic lists gives the same ranking as one query over
+    every topic. Ties go to the lower question id, then the earlier topic.
+    """
+    paths = [topic_path(t).as_posix() for t in topics]
+    limit = -1 if fetch_all else max(0, count)
+    with profiling.span("select"):
+        if len(paths) == 1:
+            results = [_weakest_candidates(paths[0], user_id, limit)]
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(max_workers=min(MIX_WORKERS, len(paths))) as pool:
+                results = list(pool.map(lambda p: _weakest_candidates(p, user_id, limit), paths))
+        ranked = heapq.merge(*(
+            [(score, qid, i) for score, qid in rows] for i, (rows, _) in enumerate(results)
+        ))
+        picked = [(i, qid) for _, qid, i in islice(ranked, None if fetch_all else max(0, count))]
+    sources = [QuestionStream(path, (), page_size, version) for path, (_, version) in zip(paths, results)]
+    return MixedQuestionStream(sources, list(topics), _wrap(picked, count, fetch_all), page_size)
+
+
+def _rag_bucket(cc: int, ac: int) -> int:
+    """Index into (green, amber, red) for a question's correct/attempt counts."""
+    ratio = cc / ac if ac else 0.0
+    if ratio >= GREEN_THRESHOLD:
+        return 0
+    if ratio >= AMBER_THRESHOLD:
+        return 1
+    return 2
+
+
+@profiling.timed("rag recompute")
+def _count_rag(tconn, uid: int) -> list[int]:
+    """Full rescan of a user's question_stats into [green, amber, red]."""
+    counts = [0, 0, 0]
+    for cc, ac in tconn.execute(
+        "SELECT correct_count, attempt_count FROM question_stats WHERE user_id=?", (uid,)
+    ):
+        counts[_rag_bucket(cc, ac)] += 1
+    return counts
+
+
+def _store_rag(tconn, uid: int, counts) -> None:
+    tconn.execute(
+        "INSERT INTO rag_counters (user_id, green, amber, red) VALUES (?,?,?,?) "
+        "ON CONFLICT(user_id) DO UPDATE SET green=excluded.green, amber=excluded.amber, red=excluded.red",
+        (uid, *counts),
+    )
+
+
+def _write_topic_summary(tconn, uid: int, topic: str, counts) -> None:
+    """Upsert user_topic_stats through a topic connection with main.db attached as hq."""
+    green, amber, red = counts
+    total = green + amber + red
+    pct_g = (green / total * 100) if total else 0
+    pct_a = (amber / total * 100) if total else 0
+    pct_r = (red / total * 100) if total else 0
+    tconn.execute(
+        (
+            "INSERT INTO hq.user_topic_stats (user_id, topic, pct_green, pct_amber, pct_red) "
+            "VALUES (?,?,?,?,?) "
+            "ON CONFLICT(user_id, topic) DO UPDATE SET "
+            "pct_green=excluded.pct_green, pct_amber=excluded.pct_amber, pct_red=excluded.pct_red, "
+            "updated_at=CURRENT_TIMESTAMP"
+        ),
+        (uid, topic, pct_g, pct_a, pct_r),
+    )
+
+
+@profiling.timed("apply results")
+def _apply_results(tconn, uid: int, session_results, now: float) -> None:
+    """Write one session's answers to a topic DB, leaving the transaction open.
+
+    `session_results` holds (question_id, ok) or (question_id, ok, answer_id)
+    tuples. Only the topic DB is written: the answers are queued in
+    history_outbox for _drain_history to copy once the caller has committed.
+    """
+    # aggregate repeats of the same question so each stats row is written once
+    deltas: dict[int, list[int]] = {}
+    for qid, ok, *_ in session_results:
+        d = deltas.setdefault(qid, [0, 0])
+        d[0] += int(ok)
+        d[1] += 1
+
+    row = tconn.execute("SELECT green, amber, red FROM rag_counters WHERE user_id=?", (uid,)).fetchone()
+    # DBs written before the counters existed are seeded once from a full scan
+    counts = list(row) if row else _count_rag(tconn, uid)
+    prior = {
+        qid: (cc, ac)
+        for qid, cc, ac in select_in(
+            tconn,
+            "SELECT question_id, correct_count, attempt_count FROM question_stats "
+            "WHERE user_id=? AND question_id IN ({})",
+            deltas,
+            (uid,),
+        )
+    }
+    for qid, (dc, da) in deltas.items():
+        cc, ac = prior.get(qid, (0, 0))
+        if ac:
+            counts[_rag_bucket(cc, ac)] -= 1
+        counts[_rag_bucket(cc + dc, ac + da)] += 1
+
+    tconn.executemany(
+        "INSERT INTO question_stats (user_id, question_id, correct_count, attempt_count) VALUES (?,?,?,?) "
+        "ON CONFLICT(user_id, question_id) DO UPDATE SET "
+        "correct_count=correct_count+excluded.correct_count, "
+        "attempt_count=attempt_count+excluded.attempt_count, last_updated=CURRENT_TIMESTAMP",
+        [(uid, qid, dc, da) for qid, (dc, da) in deltas.items()],
+    )
+    # timestamps come from when the quiz finished, which for journaled
+    # sessions can be a while before they are written
+    tconn.executemany(
+        "INSERT INTO history_outbox (user_id, question_id, was_correct, answer_id, answered_at) VALUES (?,?,?,?,?)",
+        [(uid, qid, int(ok), choice[0] if choice else None, now) for qid, ok, *choice in session_results],
+    )
+    record_reviews(tconn, uid, session_results, now)
+    _store_rag(tconn, uid, counts)
+
 
+@profiling.timed("drain history")
+def _drain_history(tconn, topic: str) -> None:
+    """Copy a topic's history_outbox into answer history and the user summaries,
+    then empty it. Call outside a transaction, with main.db attached as hq.
 
-def update_stats(username: str, topic: str, session_results: list[tuple[int, bool]]) -> None:
+    WAL databases commit one file at a time, so history is not written in the
+    stats transaction. Each history file instead takes its rows together with
+    its history_applied watermark, so running this again after a crash at
+    any point copies every answer exactly once.
+    """
+    while True:
+        rows = tconn.execute(
+            "SELECT entry_id, user_id, question_id, was_correct, answer_id, answered_at FROM history_outbox "
+            "ORDER BY entry_id LIMIT ?",
+            (OUTBOX_BATCH,),
+        ).fetchall()
+        if not rows:
+            return
+        by_month: dict[str | None, list[tuple]] = {}
+        for row in rows:
+            month = time.strftime("%Y-%m", time.gmtime(row[5])) if sharded() else None
+            by_month.setdefault(month, []).append(row)
+        for month, part in by_month.items():
+            hist = history_schema(tconn, month)
+            # IMMEDIATE takes the write locks before the watermark is read, so
+            # two processes draining the same topic copy each row once
+            tconn.execute("BEGIN IMMEDIATE")
+            mark = tconn.execute(f"SELECT entry_id FROM {hist}.history_applied WHERE topic = ?", (topic,)).fetchone()
+            part = [r for r in part if r[0] > (mark[0] if mark else 0)]
+            if part:
+                _copy_history(tconn, hist, topic, part)
+            tconn.commit()
+        tconn.execute("DELETE FROM history_outbox WHERE entry_id <= ?", (rows[-1][0],))
+        tconn.commit()
+
+
+def _copy_history(tconn, hist: str, topic: str, rows) -> None:
+    tconn.executemany(
+        f"INSERT INTO {hist}.answer_history (user_id, topic, question_id, was_correct, answer_id, created_at) "
+        "VALUES (?,?,?,?,?,datetime(?, 'unixepoch'))",
+        [(uid, topic, qid, ok, aid, t) for _, uid, qid, ok, aid, t in rows],
+    )
+    daily: dict[tuple[int, str], list[int]] = {}
+    for _, uid, _, ok, _, t in rows:
+        d = daily.setdefault((uid, time.strftime("%Y-%m-%d", time.gmtime(t))), [0, 0])
+        d[0] += 1
+        d[1] += ok
+    tconn.executemany(
+        f"INSERT INTO {hist}.answer_daily (user_id, topic, day, attempts, correct) VALUES (?,?,?,?,?) "
+        "ON CONFLICT(user_id, topic, day) DO UPDATE SET "
+        "attempts=attempts+excluded.attempts, correct=correct+excluded.correct",
+        [(uid, topic, day, a, c) for (uid, day), (a, c) in daily.items()],
+    )
+    tconn.execute(
+        f"INSERT INTO {hist}.history_applied (topic, entry_id) VALUES (?,?) "
+        "ON CONFLICT(topic) DO UPDATE SET entry_id = excluded.entry_id",
+        (topic, rows[-1][0]),
+    )
+    # summaries are overwritten from the counters, so repeating this is harmless
+    for uid in dict.fromkeys(r[1] for r in rows):
+        row = tconn.execute("SELECT green, amber, red FROM rag_counters WHERE user_id=?", (uid,)).fetchone()
+        _write_topic_summary(tconn, uid, topic, row or (0, 0, 0))
+
+
+@profiling.timed("update stats")
+def update_stats(username: str, topic: str, session_results: list[tuple]) -> None:
+    """Record a finished session: (question_id, ok[, answer_id]) per answer."""
     ensure_initialized()
     uid = _get_user_id(username)
     if uid is None:
         raise RuntimeError(f"User '{username}' does not exist.")
+    if journal.write_behind():
+        journal.append(uid, topic, session_results)
+        return
 
     topic_db = os.path.join(str(TOPICS_DIR), f"{topic}.db")
-    tconn = get_connection(topic_db)
-    mconn = get_connection(str(MAIN_DB_PATH))
-    try:
-        for qid, ok in session_results:
-            row = tconn.execute(
-                "SELECT correct_count, attempt_count FROM question_stats WHERE user_id=? AND question_id=?",
-                (uid, qid),
-            ).fetchone()
-            if row:
-                cc, ac = row
-                cc += int(ok)
-                ac += 1
-                tconn.execute(
-                    "UPDATE question_stats SET correct_count=?, attempt_count=?, last_updated=CURRENT_TIMESTAMP "
-                    "WHERE user_id=? AND question_id=?",
-                    (cc, ac, uid, qid),
-                )
-            else:
-                tconn.execute(
-                    "INSERT INTO question_stats (user_id, question_id, correct_count, attempt_count) VALUES (?,?,?,?)",
-                    (uid, qid, int(ok), 1),
-                )
-            mconn.execute(
-                "INSERT INTO answer_history (user_id, topic, question_id, was_correct) VALUES (?,?,?,?)",
-                (uid, topic, qid, int(ok)),
-            )
-        tconn.commit(); mconn.commit()
+    with pooled_connection(topic_db) as tconn:
+        ensure_topic_schema(tconn, topic_db)
+        attach(tconn, "hq", str(MAIN_DB_PATH))
+        _apply_results(tconn, uid, session_results, time.time())
+        tconn.commit()
+        _drain_history(tconn, topic)
 
-        # recompute topic-level RAG
-        rows = tconn.execute(
-            "SELECT correct_count, attempt_count FROM question_stats WHERE user_id=?",
-            (uid,),
-        ).fetchall()
-        green = amber = red = total = 0
-        for cc, ac in rows:
-            ratio = cc / ac if ac else 0.0
-            if ratio >= GREEN_THRESHOLD:
-                green += 1
-            elif ratio >= AMBER_THRESHOLD:
-                amber += 1
-            else:
-                red += 1
-            total += 1
-        pct_g = (green / total * 100) if total else 0
-        pct_a = (amber / total * 100) if total else 0
-        pct_r = (red / total * 100) if total else 0
-        mconn.execute(
-            (
-                "INSERT INTO user_topic_stats (user_id, topic, pct_green, pct_amber, pct_red) "
-                "VALUES (?,?,?,?,?) "
-                "ON CONFLICT(user_id, topic) DO UPDATE SET "
-                "pct_green=excluded.pct_green, pct_amber=excluded.pct_amber, pct_red=excluded.pct_red, "
-                "updated_at=CURRENT_TIMESTAMP"
-            ),
-            (uid, topic, pct_g, pct_a, pct_r),
+
+def update_mixed_stats(username: str, results: list[tuple]) -> None:
+    """update_stats for (topic, question_id, ok[, answer_id]) results, one batch per topic."""
+    update_stats_many([(username, *r) for r in results])
+
+
+@profiling.timed("update stats")
+def update_stats_many(results) -> None:
+    """Record (username, topic, question_id, ok[, answer_id]) results for many users.
+
+    Results are grouped by topic and then by user, and each topic DB's stats
+    are written in one transaction. Raises RuntimeError, before writing anything,
+    if a username does not exist.
+    """
+    ensure_initialized()
+    by_topic: dict[str, dict[str, list[tuple]]] = {}
+    for username, topic, *result in results:
+        by_topic.setdefault(topic, {}).setdefault(username, []).append(tuple(result))
+    usernames = {name for users in by_topic.values() for name in users}
+    uids = _get_user_ids(usernames)
+    missing = usernames - uids.keys()
+    if missing:
+        raise RuntimeError(f"User '{min(missing)}' does not exist.")
+    if journal.write_behind():
+        journal.append_many(
+            (uids[name], topic, session) for topic, users in by_topic.items() for name, session in users.items()
         )
-        mconn.commit()
-    finally:
-        tconn.close(); mconn.close()
-
-
-# ---------- CLI entry ----------
-
-def _build_parser() -> argparse.ArgumentParser:
-    p = argparse.ArgumentParser(prog="history-quiz", description="History Quiz CLI")
-    sub = p.add_subparsers(dest="command", required=True)
-
-    p_reg = sub.add_parser("register", help="Create a new user")
-    p_reg.add_argument("username", help="Username to register")
-    p_reg.set_defaults(func=register_user)
-
-    p_sum = sub.add_parser("summary", help="View your RAG summary")
-    p_sum.add_argument("username", help="Your username")
-    p_sum.set_defaults(func=view_summary)
-
-    p_q = sub.add_parser("quiz", help="Take a quiz on a topic")
-    p_q.add_argument("username", help="Your username")
-    p_q.add_argument("topic", help="Topic name (filename without .db)")
-    g = p_q.add_mutually_exclusive_group(required=True)
-    g.add_argument("--count", type=int, help="Number of questions to ask")
-    g.add_argument("--all", action="store_true", help="Ask all questions")
-
-    def _run(args):
-        ensure_initialized()
-        if args.command == "quiz":
-            # lightweight wrapper so exit codes are clear
-            uid = _get_user_id(args.username)
-            if not uid:
-                print(f"Error: User '{args.username}' not found. Please register first.")
-                return 1
-            topic_db = (Path(TOPICS_DIR) / f"{args.topic}.db").as_posix()
-            if not Path(topic_db).is_file():
-                print(f"Error: Topic database not found: {topic_db}")
-                return 1
-            qs = load_questions(topic_db, uid, args.count or 0, bool(args.all))
-            if not qs:
-                print(f"No questions found in topic '{args.topic}'.")
-                return 0
-            # simple terminal quiz loop
-            results = []
-            for idx, (qid, prompt, answers) in enumerate(qs if args.all else qs[: args.count], start=1):
-                print(f"Q{idx}: {prompt}")
-                for i, (_, text, _) in enumerate(answers, start=1):
-                    print(f"  {i}) {text}")
-                try:
-                    choice = int(input("Your answer (number): ").strip()) - 1
-                    correct = bool(answers[choice][2])
-                except Exception:
-                    correct = False
-                print("Correct!" if correct else "Wrong.")
-                print()
-                results.append((qid, correct))
-            update_stats(args.username, args.topic, results)
-            ok = sum(1 for _, c in results if c)
-            print(f"✨ Quiz complete: you answered {ok}/{len(results)} correctly. ✨")
-            return 0
-        else:
-            return args.func(args) or 0
+        return
+
+    now = time.time()
+    for topic, users in by_topic.items():
+        topic_db = os.path.join(str(TOPICS_DIR), f"{topic}.db")
+        with pooled_connection(topic_db) as tconn:
+            ensure_topic_schema(tconn, topic_db)
+            attach(tconn, "hq", str(MAIN_DB_PATH))
+            for name, session in users.items():
+                _apply_results(tconn, uids[name], session, now)
+            tconn.commit()
+            _drain_history(tconn, topic)
+
+
+def rebuild_stats(args) -> int:
+    """Recompute RAG counters from question_stats and report any drift."""
+    ensure_initialized()
+    topics = [args.topic] if args.topic else [name for name, *_ in list_topics()]
+    uid = None
+    if args.username:
+        uid = _get_user_id(args.username)
+        if not uid:
+            print(f"Error: User '{args.username}' not found.")
+            return 1
+    drifted = checked = 0
+    for topic in topics:
+        topic_db = topic_path(topic).as_posix()
+        if not Path(topic_db).is_file():
+            print(f"Error: Topic database not found: {topic_db}")
+            return 1
+        with pooled_connection(topic_db) as tconn:
+            ensure_topic_schema(tconn, topic_db)
+            attach(tconn, "hq", str(MAIN_DB_PATH))
+            _drain_history(tconn, topic)  # history left queued by an interrupted write
+            uids = [uid] if uid else [
+                r[0] for r in tconn.execute("SELECT DISTINCT user_id FROM question_stats")
+            ]
+            for u in uids:
+                counts = _count_rag(tconn, u)
+                row = tconn.execute("SELECT green, amber, red FROM rag_counters WHERE user_id=?", (u,)).fetchone()
+                if row is not None and list(row) != counts:
+                    drifted += 1
+                    print(f"  drift in {topic} for user {u}: stored={tuple(row)} actual={tuple(counts)}")
+                _store_rag(tconn, u, counts)
+                _write_topic_summary(tconn, u, topic, counts)
+                checked += 1
+            tconn.commit()
+    print(f"Rebuilt RAG counters for {checked} user/topic pair(s); {drifted} had drifted.")
+    return 0
 
-    p.set_defaults(func=_run)
-    return p
 
+# ---------- CLI commands not covered above (the parser is in cli.py) ----------
 
-def cli(argv: list[str] | None = None) -> int:
-    parser = _build_parser()
-    args = parser.parse_args(argv)
-    rc = args.func(args)
-    return int(rc or 0)
+def take_quiz(args) -> int:
+    ensure_initialized()
+    if args.all_topics:
+        topics = [name for name, *_ in list_topics()]
+    elif args.topics:
+        # a topic named twice would be ranked, and its questions asked, twice
+        topics = list(dict.fromkeys(t.strip() for t in args.topics.split(",") if t.strip()))
+    else:
+        topics = [args.topic] if args.topic else []
+    if args.all_topics and not topics:
+        print(f"No topics found in {TOPICS_DIR}.")
+        return 0
+    if not topics or (args.topic and (args.topics or args.all_topics)):
+        print("Error: give one topic, or --topics a,b,c, or --all-topics.")
+        return 2
+    mixed = bool(args.topics or args.all_topics)
+    if mixed and args.mode != "weakest":
+        print("Error: a mixed-topic quiz only supports --mode weakest.")
+        return 2
+    uid = _get_user_id(args.username)
+    if not uid:
+        print(f"Error: User '{args.username}' not found. Please register first.")
+        return 1
+    for topic in topics:
+        topic_db = topic_path(topic).as_posix()
+        if not Path(topic_db).is_file():
+            print(f"Error: Topic database not found: {topic_db}")
+            return 1
+    if mixed:
+        qs = iter_mixed_questions(topics, uid, args.count or 0, bool(args.all))
+    else:
+        qs = iter_questions(topic_db, uid, args.count or 0, bool(args.all), args.mode)
+    if not len(qs):
+        if args.mode == "review":
+            print(f"Nothing in topic '{args.topic}' is due for review.")
+        else:
+            print(f"No questions found in topic(s) {', '.join(repr(t) for t in topics)}.")
+        return 0
+    # simple terminal quiz loop
+    results = []
+    for idx, q in enumerate(qs, start=1):
+        print(f"Q{idx} [{q.topic}]: {q.prompt}" if mixed else f"Q{idx}: {q.prompt}")
+        for i, a in enumerate(q.answers, start=1):
+            print(f"  {i}) {a.text}")
+        try:
+            choice = int(input("Your answer (number): ").strip()) - 1
+        except ValueError:
+            choice = -1
+        except EOFError:
+            # Ctrl-D, or piped answers ran out: end here, keeping what was answered
+            print()
+            break
+        correct = q.is_correct(choice)
+        print("Correct!" if correct else "Wrong.")
+        print()
+        results.append((q.topic or topics[0], q.question_id, correct, q.choice_id(choice)))
+    update_mixed_stats(args.username, results)
+    ok = sum(1 for r in results if r[2])
+    if len(results) < len(qs):
+        print(f"Quiz ended early: you answered {ok}/{len(results)} correctly.")
+    else:
+        print(f"✨ Quiz complete: you answered {ok}/{len(results)} correctly. ✨")
+    return 0
 
 
 if __name__ == "__main__":
-    raise SystemExit(cli())
\ No newline at end of file
+    raise SystemExit(cli())
@@ -0,0 +1,58 @@
+from __future__ import annotations
+import os, time
+from .catalog import list_topics, register_topic, topic_path
+from .config import ensure_initialized
+from .create_topic_db import SCHEMA_VERSION, migrate_topic
+from .utils.db_connection import get_connection
+
+
+def _migrate_one(path: str) -> tuple[str, int, int, float]:
+    """Worker: migrate one topic DB on a private connection."""
+    t0 = time.perf_counter()
+    conn = get_connection(path)
+    try:
+        before, after = migrate_topic(conn)
+    finally:
+        conn.close()
+    return path, before, after, time.perf_counter() - t0
+
+
+def migrate_topics(args) -> int:
+    """Upgrade main.db and topic DBs ahead of time, topics in parallel.
+
+    Quizzing migrates a topic on first open anyway; this moves that cost out
+    of the first quiz, e.g. after installing a release that adds indexes.
+    """
+    ensure_initialized()  # main.db is migrated on its first open
+    names = [name for name, *_ in list_topics()] if args.all else args.topics
+    if not names:
+        print("Error: name at least one topic, or pass --all.")
+        return 2
+    paths = []
+    for name in names:
+        path = topic_path(name).as_posix()
+        if not os.path.isfile(path):
+            print(f"Error: Topic database not found: {path}")
+            return 1
+        paths.append(path)
+
+    workers = max(1, min(args.jobs or os.cpu_count() or 1, len(paths)))
+    t0 = time.perf_counter()
+    if workers == 1:
+        results = [_migrate_one(p) for p in paths]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_migrate_one, paths))
+    upgraded = 0
+    for (path, before, after, seconds), name in zip(results, names):
+        if after != before:
+            upgraded += 1
+            register_topic(path)  # record the new schema_version in the catalog
+            print(f"  • {name}: v{before} -> v{after} ({seconds * 1000:.0f} ms)")
+    print(
+        f"Migrated {upgraded} of {len(paths)} topic DB(s) to schema v{SCHEMA_VERSION} "
+        f"in {time.perf_counter() - t0:.2f}s using {workers} process(es)."
+    )
+    return 0
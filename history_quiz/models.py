@@ -0,0 +1,45 @@
+from __future__ import annotations
+import sys
+
+
+class Answer:
+    __slots__ = ("answer_id", "text", "is_correct")
+
+    def __init__(self, answer_id: int, text: str, is_correct: bool):
+        self.answer_id = answer_id
+        # option texts repeat a lot across a bank ("1534", "Henry VIII", ...)
+        self.text = sys.intern(text)
+        self.is_correct = bool(is_correct)
+
+    def __iter__(self):
+        # unpacks like the (answer_id, text, is_correct) tuples used before
+        return iter((self.answer_id, self.text, self.is_correct))
+
+    def __repr__(self) -> str:
+        return f"Answer({self.answer_id!r}, {self.text!r}, {self.is_correct!r})"
+
+
+class Question:
+    __slots__ = ("question_id", "prompt", "answers", "topic")
+
+    def __init__(self, question_id: int, prompt: str, answers: list[Answer], topic: str | None = None):
+        self.question_id = question_id
+        self.prompt = prompt
+        self.answers = answers
+        # set on questions from a mixed quiz, where ids alone are ambiguous
+        self.topic = topic
+
+    def __iter__(self):
+        # unpacks like the (question_id, prompt, answers) tuples used before
+        return iter((self.question_id, self.prompt, self.answers))
+
+    def __repr__(self) -> str:
+        return f"Question({self.question_id!r}, {self.prompt!r}, {self.answers!r})"
+
+    def is_correct(self, choice_index: int) -> bool:
+        """Whether the answer at `choice_index` (0-based, as displayed) is right."""
+        return 0 <= choice_index < len(self.answers) and self.answers[choice_index].is_correct
+
+    def choice_id(self, choice_index: int) -> int | None:
+        """answer_id of the answer at `choice_index`, or None if out of range."""
+        return self.answers[choice_index].answer_id if 0 <= choice_index < len(self.answers) else None
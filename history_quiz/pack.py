@@ -0,0 +1,186 @@
+"""Read-only compiled topic packs.
+
+`history-quiz compile <topic>` writes topics/<topic>.pack next to the topic
+DB: a fixed header, then 8-byte aligned sections
+
+    qids      int64[n]      question ids, ascending
+    q_off     int64[n+1]    prompt i is prompts[q_off[i]:q_off[i+1]]
+    a_start   int64[n+1]    answers of question i are a_start[i]:a_start[i+1]
+    a_ids     int64[m]      answer ids
+    a_off     int64[m+1]    answer j is texts[a_off[j]:a_off[j+1]]
+    a_correct uint8[m]      1 for the correct answer
+    prompts   bytes         UTF-8 prompts, back to back
+    texts     bytes         UTF-8 answer texts, back to back
+
+The file is mapped with mmap and the arrays are memoryview casts over it, so
+opening a pack reads only the header, processes share the pages through the
+OS cache, and only the questions actually asked are decoded. A pack records
+the topic's content_version; QuestionStream ignores a pack whose version does
+not match the DB and reads from SQLite instead. User stats never go in packs.
+"""
+from __future__ import annotations
+import mmap, os, struct, sys
+from array import array
+from bisect import bisect_left
+from .catalog import list_topics, topic_path
+from .create_topic_db import content_version
+from .models import Answer, Question
+from .utils.db_connection import get_connection
+
+MAGIC = b"HQPACK\0\0"
+FORMAT = 1
+# magic, format, content_version, questions, answers, 8 section offsets
+HEADER = struct.Struct("<8sIqqq8q")
+
+_open: dict[str, "Pack"] = {}
+
+
+def pack_path(topic_db_path: str) -> str:
+    return os.path.splitext(topic_db_path)[0] + ".pack"
+
+
+class Pack:
+    def __init__(self, path: str):
+        if sys.byteorder != "little":
+            raise ValueError("topic packs are little-endian")
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, fmt, self.version, n, m, *offs = HEADER.unpack_from(self._mm)
+        if magic != MAGIC or fmt != FORMAT:
+            raise ValueError(f"{path} is not a version {FORMAT} topic pack")
+        buf = memoryview(self._mm)
+        self.qids = buf[offs[0] : offs[0] + 8 * n].cast("q")
+        self.q_off = buf[offs[1] : offs[1] + 8 * (n + 1)].cast("q")
+        self.a_start = buf[offs[2] : offs[2] + 8 * (n + 1)].cast("q")
+        self.a_ids = buf[offs[3] : offs[3] + 8 * m].cast("q")
+        self.a_off = buf[offs[4] : offs[4] + 8 * (m + 1)].cast("q")
+        self.a_correct = buf[offs[5] : offs[5] + m]
+        self.prompts = buf[offs[6] : offs[6] + self.q_off[n]]
+        self.texts = buf[offs[7] : offs[7] + self.a_off[m]]
+
+    def __len__(self) -> int:
+        return len(self.qids)
+
+    def question(self, i: int) -> Question:
+        q_off, a_off, texts = self.q_off, self.a_off, self.texts
+        return Question(
+            self.qids[i],
+            str(self.prompts[q_off[i] : q_off[i + 1]], "utf-8"),
+            [
+                Answer(self.a_ids[j], str(texts[a_off[j] : a_off[j + 1]], "utf-8"), self.a_correct[j])
+                for j in range(self.a_start[i], self.a_start[i + 1])
+            ],
+        )
+
+    def lookup(self, qids) -> tuple[dict[int, Question], list[int]]:
+        """Same contract as QuestionCache.lookup: (found, ids not in the pack)."""
+        found, missing = {}, []
+        n = len(self.qids)
+        for qid in qids:
+            i = bisect_left(self.qids, qid)
+            if i < n and self.qids[i] == qid:
+                found[qid] = self.question(i)
+            else:
+                missing.append(qid)
+        return found, missing
+
+
+def open_pack(topic_db_path: str, version: int) -> Pack | None:
+    """The topic's pack if there is one for content `version`, else None."""
+    path = pack_path(topic_db_path)
+    pack = _open.get(path)
+    if pack is None or pack.version != version:
+        # not opened yet, or recompiled since
+        try:
+            pack = _open[path] = Pack(path)
+        except (OSError, ValueError):
+            _open.pop(path, None)
+            return None
+    return pack if pack.version == version else None
+
+
+def _aligned(f) -> int:
+    pad = -f.tell() % 8
+    f.write(b"\0" * pad)
+    return f.tell()
+
+
+def compile_pack(topic_db_path: str) -> tuple[str, int]:
+    """Write the pack for a topic DB; returns (pack path, questions packed).
+
+    Raises OSError if the old pack cannot be replaced, as on Windows while
+    another process has it mapped. The old pack is left in place; its version
+    no longer matches the DB, so readers fall back to SQLite until the next
+    compile succeeds.
+    """
+    qids, q_off, a_start = array("q"), array("q", [0]), array("q", [0])
+    a_ids, a_off, a_correct = array("q"), array("q", [0]), bytearray()
+    prompts, texts = bytearray(), bytearray()
+    conn = get_connection(topic_db_path)
+    try:
+        version = content_version(conn)
+        # both cursors walk question_id order, so answers are merged in one pass
+        answers = conn.execute(
+            "SELECT question_id, answer_id, text, is_correct FROM answers ORDER BY question_id, answer_id"
+        )
+        pending = next(answers, None)
+        for qid, prompt in conn.execute(
+            "SELECT question_id, prompt FROM questions ORDER BY question_id"
+        ):
+            qids.append(qid)
+            prompts += prompt.encode("utf-8")
+            q_off.append(len(prompts))
+            while pending is not None and pending[0] < qid:
+                pending = next(answers, None)  # orphaned answer rows
+            while pending is not None and pending[0] == qid:
+                a_ids.append(pending[1])
+                texts += pending[2].encode("utf-8")
+                a_off.append(len(texts))
+                a_correct.append(1 if pending[3] else 0)
+                pending = next(answers, None)
+            a_start.append(len(a_ids))
+    finally:
+        conn.close()
+
+    if sys.byteorder == "big":
+        for section in (qids, q_off, a_start, a_ids, a_off):
+            section.byteswap()
+    path = pack_path(topic_db_path)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(b"\0" * HEADER.size)
+        offs = []
+        for section in (qids, q_off, a_start, a_ids, a_off, a_correct, prompts, texts):
+            offs.append(_aligned(f))
+            f.write(section)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, FORMAT, version, len(qids), len(a_ids), *offs))
+    _open.pop(path, None)  # Windows cannot replace a file this process has mapped
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return path, len(qids)
+
+
+def compile_topics(args) -> int:
+    names = [name for name, *_ in list_topics()] if args.all else args.topics
+    if not names:
+        print("Error: name at least one topic, or pass --all.")
+        return 2
+    for name in names:
+        topic_db = topic_path(name).as_posix()
+        if not os.path.isfile(topic_db):
+            print(f"Error: Topic database not found: {topic_db}")
+            return 1
+        try:
+            path, n = compile_pack(topic_db)
+        except OSError as e:
+            print(f"Error: could not write the pack for '{name}': {e}")
+            return 1
+        print(f"Compiled {n} questions from '{name}' into {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+    return 0
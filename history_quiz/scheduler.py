@@ -0,0 +1,81 @@
+from __future__ import annotations
+import time
+from .utils.db_connection import select_in
+
+# SuperMemo SM-2 with binary grading: a correct answer counts as quality 4,
+# a wrong one as quality 1
+MIN_EASE = 1.3
+START_EASE = 2.5
+DAY = 86400.0
+
+
+def next_review(reps: int, interval: float, ease: float, ok: bool, now: float):
+    """Return (reps, interval_days, ease, due_at) after one answer."""
+    quality = 4 if ok else 1
+    ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    if not ok:
+        reps, interval = 0, 1.0
+    else:
+        reps += 1
+        interval = 1.0 if reps == 1 else 6.0 if reps == 2 else round(interval * ease, 2)
+    return reps, interval, ease, now + interval * DAY
+
+
+def select_due(tconn, user_id: int, limit: int, now: float | None = None) -> list[int]:
+    """Due questions, most overdue first, then never-reviewed ones in id order.
+
+    The due part is a range scan on idx_review_due, so picking k items costs
+    O(log n + k) however large the topic is. limit < 0 means no limit.
+    """
+    now = time.time() if now is None else now
+    rows = [row[0] for row in tconn.execute(
+        """
+        SELECT q.question_id
+        FROM review_schedule r
+        JOIN questions q ON q.question_id = r.question_id
+        WHERE r.user_id = ? AND r.due_at <= ? AND q.retired = 0
+        ORDER BY r.due_at
+        LIMIT ?
+        """,
+        (user_id, now, limit),
+    )]
+    if limit < 0 or len(rows) < limit:
+        rows += [row[0] for row in tconn.execute(
+            """
+            SELECT q.question_id
+            FROM questions q
+            WHERE q.retired = 0 AND NOT EXISTS (
+              SELECT 1 FROM review_schedule r WHERE r.user_id = ? AND r.question_id = q.question_id
+            )
+            ORDER BY q.question_id
+            LIMIT ?
+            """,
+            (user_id, limit - len(rows) if limit >= 0 else -1),
+        )]
+    return rows
+
+
+def record_reviews(tconn, user_id: int, session_results, now: float | None = None) -> None:
+    """Advance the schedule of every answered question, in answer order."""
+    now = time.time() if now is None else now
+    qids = list({r[0] for r in session_results})
+    state: dict[int, tuple[int, float, float]] = {}
+    for qid, reps, interval, ease in select_in(
+        tconn,
+        "SELECT question_id, repetitions, interval_days, ease FROM review_schedule "
+        "WHERE user_id = ? AND question_id IN ({})",
+        qids,
+        (user_id,),
+    ):
+        state[qid] = (reps, interval, ease)
+    due: dict[int, float] = {}
+    for qid, ok, *_ in session_results:
+        reps, interval, ease, due[qid] = next_review(*state.get(qid, (0, 0.0, START_EASE)), bool(ok), now)
+        state[qid] = (reps, interval, ease)
+    tconn.executemany(
+        "INSERT INTO review_schedule (user_id, question_id, repetitions, interval_days, ease, due_at) "
+        "VALUES (?,?,?,?,?,?) "
+        "ON CONFLICT(user_id, question_id) DO UPDATE SET repetitions=excluded.repetitions, "
+        "interval_days=excluded.interval_days, ease=excluded.ease, due_at=excluded.due_at",
+        [(user_id, qid, *state[qid], due[qid]) for qid in due],
+    )
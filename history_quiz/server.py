@@ -0,0 +1,251 @@
+from __future__ import annotations
+import asyncio, json, time, uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+from . import journal
+from .catalog import topic_path
+from .config import ensure_initialized
+from .main import QUIZ_MODES, QuizSession, _get_user_id, create_user, get_summary, iter_questions, update_stats
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+SESSION_TTL = 30 * 60  # seconds a quiz may sit idle before it is dropped
+MAX_BODY = 1 << 20
+MAX_COUNT = 1000  # questions per quiz; larger counts are clamped
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _question_json(q) -> dict | None:
+    if q is None:
+        return None
+    # never send is_correct to the client
+    return {
+        "question_id": q.question_id,
+        "prompt": q.prompt,
+        "answers": [{"answer_id": a.answer_id, "text": a.text} for a in q.answers],
+    }
+
+
+class QuizServer:
+    """JSON-over-HTTP front end for many concurrent learners.
+
+    Reads (question loading, paging, summaries, user lookups) run on a
+    bounded thread pool. Stats writes go through one single-threaded writer
+    per topic DB, so two sessions finishing on the same topic queue up
+    instead of failing with "database is locked".
+    """
+
+    def __init__(self, workers: int = 8):
+        self.readers = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="history-quiz-read")
+        self.writers: dict[str, ThreadPoolExecutor] = {}
+        self.sessions: dict[str, tuple[QuizSession, float]] = {}
+        self.routes = {
+            ("POST", "/register"): self.register,
+            ("POST", "/quiz/start"): self.start_quiz,
+            ("POST", "/quiz/answer"): self.answer,
+            ("POST", "/quiz/finish"): self.finish,
+            ("GET", "/summary"): self.summary,
+            ("GET", "/health"): self.health,
+        }
+
+    async def _read(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.readers, fn, *args)
+
+    async def _write(self, topic: str, fn, *args):
+        writer = self.writers.get(topic)
+        if writer is None:
+            writer = self.writers[topic] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"history-quiz-write-{topic}")
+        return await asyncio.get_running_loop().run_in_executor(writer, fn, *args)
+
+    def _session(self, body: dict) -> QuizSession:
+        entry = self.sessions.get(str(body.get("session_id", "")))
+        if entry is None:
+            raise HTTPError(404, "Unknown or expired session.")
+        self.sessions[body["session_id"]] = (entry[0], time.monotonic())
+        return entry[0]
+
+    def _expire_sessions(self) -> None:
+        cutoff = time.monotonic() - SESSION_TTL
+        for sid in [sid for sid, (_, seen) in self.sessions.items() if seen < cutoff]:
+            del self.sessions[sid]
+
+    # ---------- endpoints ----------
+
+    async def register(self, body: dict, query: dict):
+        username = str(body.get("username", "")).strip()
+        if not username:
+            raise HTTPError(400, "Username is required.")
+        if not await self._read(create_user, username):
+            raise HTTPError(409, f"User '{username}' already exists.")
+        return 201, {"username": username}
+
+    async def start_quiz(self, body: dict, query: dict):
+        username = str(body.get("username", "")).strip()
+        topic = str(body.get("topic", "")).strip()
+        mode = body.get("mode", "weakest")
+        fetch_all = bool(body.get("all", False))
+        count = body.get("count", 10)
+        if isinstance(count, str) and count.strip().isdigit():
+            count = int(count)
+        if isinstance(count, bool) or not isinstance(count, int) or count < 1:
+            raise HTTPError(400, "count must be a positive integer.")
+        count = min(count, MAX_COUNT)
+        if mode not in QUIZ_MODES:
+            raise HTTPError(400, f"mode must be one of {', '.join(QUIZ_MODES)}.")
+
+        def prepare():
+            uid = _get_user_id(username)
+            if not uid:
+                raise HTTPError(404, f"User '{username}' not found. Please register first.")
+            topic_db = topic_path(topic)
+            if not topic or not topic_db.is_file():
+                raise HTTPError(404, f"Topic '{topic}' not found.")
+            return QuizSession(username, topic, iter_questions(topic_db.as_posix(), uid, count, fetch_all, mode))
+
+        session = await self._read(prepare)
+        self._expire_sessions()
+        sid = uuid.uuid4().hex
+        if not session.done:
+            self.sessions[sid] = (session, time.monotonic())
+        return 200, {"session_id": sid, "total": session.total, "question": _question_json(session.current())}
+
+    async def answer(self, body: dict, query: dict):
+        session = self._session(body)
+        if session.done:
+            raise HTTPError(409, "Quiz already complete; call /quiz/finish.")
+        try:
+            choice = int(body["choice"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPError(400, "choice (0-based answer index) is required.")
+        q = session.current()
+        correct_id = next((a.answer_id for a in q.answers if a.is_correct), None)
+        # answering may pull the next page from SQLite
+        ok = await self._read(session.answer, choice)
+        return 200, {"correct": ok, "correct_answer_id": correct_id, "next": _question_json(session.current())}
+
+    async def finish(self, body: dict, query: dict):
+        session = self._session(body)
+        del self.sessions[body["session_id"]]
+        if session.results:
+            await self._write(session.topic, update_stats, session.username, session.topic, session.results)
+        correct = sum(1 for r in session.results if r[1])
+        return 200, {"correct": correct, "answered": len(session.results)}
+
+    async def summary(self, body: dict, query: dict):
+        username = (query.get("username") or [""])[0]
+
+        def load():
+            uid = _get_user_id(username)
+            if not uid:
+                raise HTTPError(404, f"User '{username}' not found.")
+            return get_summary(uid)
+
+        rows = await self._read(load)
+        topics = [
+            {"topic": t, "pct_green": g, "pct_amber": a, "pct_red": r, "updated_at": upd}
+            for t, g, a, r, upd in rows
+        ]
+        return 200, {"username": username, "topics": topics}
+
+    async def health(self, body: dict, query: dict):
+        return 200, {"status": "ok", "sessions": len(self.sessions)}
+
+    # ---------- HTTP plumbing ----------
+
+    async def dispatch(self, method: str, target: str, raw: bytes) -> tuple[int, dict]:
+        url = urlsplit(target)
+        handler = self.routes.get((method, url.path))
+        if handler is None:
+            known = any(path == url.path for _, path in self.routes)
+            return (405, {"error": "Method not allowed."}) if known else (404, {"error": "Not found."})
+        try:
+            body = json.loads(raw) if raw else {}
+            if not isinstance(body, dict):
+                raise ValueError
+        except ValueError:
+            return 400, {"error": "Body must be a JSON object."}
+        try:
+            return await handler(body, parse_qs(url.query))
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except Exception as e:  # keep serving other clients
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, version = line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = h.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_BODY:
+                    status, payload = 413, {"error": "Body too large."}
+                    keep_alive = False
+                else:
+                    raw = await reader.readexactly(length)
+                    status, payload = await self.dispatch(method, target, raw)
+                    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                data = json.dumps(payload).encode("utf-8")
+                writer.write(
+                    (
+                        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                        "Content-Type: application/json\r\n"
+                        f"Content-Length: {len(data)}\r\n"
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    ).encode("latin-1")
+                    + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass  # malformed request or client went away
+        finally:
+            writer.close()
+
+    def close(self) -> None:
+        self.readers.shutdown(wait=True)
+        for writer in self.writers.values():
+            writer.shutdown(wait=True)
+
+
+async def serve_forever(
+    host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, workers: int = 8, ready=None, write_behind: bool = False,
+) -> None:
+    ensure_initialized()
+    if write_behind:
+        journal.enable()
+    app = QuizServer(workers)
+    server = await asyncio.start_server(app.handle_connection, host, port)
+    if ready is not None:
+        ready(server)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        app.close()
+
+
+def serve(args) -> int:
+    print(f"Serving history quiz on http://{args.host}:{args.port} (Ctrl+C to stop)")
+    try:
+        asyncio.run(serve_forever(args.host, args.port, args.workers, write_behind=args.write_behind))
+    except KeyboardInterrupt:
+        pass
+    return 0
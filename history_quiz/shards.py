@@ -0,0 +1,179 @@
+"""Optional monthly sharding of answer history.
+
+With HQ_HISTORY_LAYOUT=monthly, answer_history and the answer_daily rollup
+are written to history/YYYY-MM.db (the month the answers were given, UTC)
+instead of main.db, so main.db stays small and each month is its own file.
+main.db keeps a directory of the shards in history_shards. Reports fan out
+over main.db plus the shards that can hold the requested days, in parallel.
+Archiving a month moves its file into history/archive/; nothing is deleted.
+"""
+from __future__ import annotations
+import os, time
+from .config import HISTORY_LAYOUT, MAIN_DB_PATH, SHARDS_DIR, ensure_initialized
+from .create_main_db import _v2_answer_choice, _v3_history_applied
+from .utils.db_connection import attach, get_connection, pooled_connection
+from .utils.migrations import migrate, run_script
+
+# same version 1 tables as in main.db, without the users foreign key
+SHARD_SCHEMA = r"""
+CREATE TABLE IF NOT EXISTS answer_history (
+  id          INTEGER PRIMARY KEY,
+  user_id     INTEGER NOT NULL,
+  topic       TEXT NOT NULL,
+  question_id INTEGER NOT NULL,
+  was_correct INTEGER NOT NULL CHECK (was_correct IN (0,1)),
+  created_at  DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_answer_history_user_topic
+  ON answer_history(user_id, topic, created_at);
+
+CREATE TABLE IF NOT EXISTS answer_daily (
+  user_id  INTEGER NOT NULL,
+  topic    TEXT NOT NULL,
+  day      TEXT NOT NULL,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  correct  INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY(user_id, topic, day)
+) WITHOUT ROWID;
+"""
+
+# kept in step with the answer_history changes in MAIN_MIGRATIONS
+SHARD_MIGRATIONS = (
+    (1, "answer_history and answer_daily", lambda conn: run_script(conn, SHARD_SCHEMA)),
+    (2, "answer_history.answer_id", _v2_answer_choice),
+    (3, "history_applied", _v3_history_applied),
+)
+
+FAN_OUT_WORKERS = 8
+
+_created: set[str] = set()
+
+
+def sharded() -> bool:
+    return HISTORY_LAYOUT == "monthly"
+
+
+def current_month() -> str:
+    return time.strftime("%Y-%m", time.gmtime())
+
+
+def shard_path(month: str) -> str:
+    return os.path.join(str(SHARDS_DIR), f"{month}.db")
+
+
+def _ensure_shard(month: str) -> str:
+    """Create a month's shard file and list it in main.db (once per process)."""
+    path = shard_path(month)
+    if month in _created:
+        return path
+    conn = get_connection(path)
+    try:
+        migrate(conn, SHARD_MIGRATIONS)
+    finally:
+        conn.close()
+    with pooled_connection(str(MAIN_DB_PATH)) as conn:
+        conn.execute("INSERT OR IGNORE INTO history_shards (month, path) VALUES (?,?)", (month, path))
+        conn.commit()
+    _created.add(month)
+    return path
+
+
+def history_schema(tconn, month: str | None = None) -> str:
+    """Attach where answer history for `month` (default: this one) goes and
+    return its schema name.
+
+    Must be called outside a transaction, after main.db is attached as hq.
+    A long-lived connection is moved to another shard when the month differs.
+    """
+    if not sharded():
+        return "hq"
+    path = _ensure_shard(month or current_month())
+    for _, name, file in tconn.execute("PRAGMA database_list").fetchall():
+        if name == "hist":
+            if os.path.realpath(file) == os.path.realpath(path):
+                return "hist"
+            tconn.execute("DETACH DATABASE hist")
+    attach(tconn, "hist", path)
+    return "hist"
+
+
+def shards(include_archived: bool = False) -> list[tuple[str, str, int]]:
+    """(month, path, archived) rows from the shard directory, oldest first."""
+    ensure_initialized()
+    with pooled_connection(str(MAIN_DB_PATH)) as conn:
+        return conn.execute(
+            "SELECT month, path, archived FROM history_shards "
+            + ("" if include_archived else "WHERE archived = 0 ")
+            + "ORDER BY month"
+        ).fetchall()
+
+
+def _query(path: str, sql: str, params) -> list[tuple]:
+    conn = get_connection(path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def fan_out(sql: str, params=(), since_day: str | None = None) -> list[tuple]:
+    """Run `sql` against main.db and every live shard that can hold rows on or
+    after `since_day` (YYYY-MM-DD), in parallel; returns all rows, unmerged.
+
+    A shard only holds answers given in its month.
+    """
+    paths = [str(MAIN_DB_PATH)] + [
+        path for month, path, _ in shards()
+        if (since_day is None or month >= since_day[:7]) and os.path.exists(path)
+    ]
+    if len(paths) == 1:
+        return _query(paths[0], sql, params)
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=min(FAN_OUT_WORKERS, len(paths))) as pool:
+        results = pool.map(lambda p: _query(p, sql, params), paths)
+        return [row for rows in results for row in rows]
+
+
+def archive(before: str) -> list[str]:
+    """Move shards for months before `before` (YYYY-MM) into the archive folder."""
+    archive_dir = os.path.join(str(SHARDS_DIR), "archive")
+    os.makedirs(archive_dir, exist_ok=True)
+    moved = []
+    for month, path, _ in shards():
+        if month >= min(before, current_month()):
+            continue
+        if os.path.exists(path):
+            # fold the WAL back in so the .db file alone is the whole shard
+            conn = get_connection(path)
+            try:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                conn.execute("PRAGMA journal_mode=DELETE")
+            finally:
+                conn.close()
+            dest = os.path.join(archive_dir, os.path.basename(path))
+            os.replace(path, dest)
+        else:
+            dest = path
+        with pooled_connection(str(MAIN_DB_PATH)) as conn:
+            conn.execute("UPDATE history_shards SET archived = 1, path = ? WHERE month = ?", (dest, month))
+            conn.commit()
+        moved.append(month)
+    return moved
+
+
+def show_shards(args) -> int:
+    if args.archive_before:
+        moved = archive(args.archive_before)
+        print(f"Archived {len(moved)} shard(s)" + (f": {', '.join(moved)}" if moved else "."))
+    if not sharded():
+        print("History layout: single (answer history is kept in main.db).")
+    rows = shards(include_archived=True)
+    if not rows:
+        print("No history shards.")
+        return 0
+    for month, path, archived in rows:
+        size = os.path.getsize(path) / 1e6 if os.path.exists(path) else 0.0
+        print(f"  • {month}  {size:8.1f} MB  {'archived' if archived else 'live'}  {path}")
+    return 0
@@ -1,9 +1,149 @@
 from __future__ import annotations
-import sqlite3, os
+import atexit, os, sqlite3, threading, time
+from contextlib import contextmanager
+from . import profiling
+
+CACHED_STATEMENTS = 256
+IN_CHUNK = 900  # values per IN (...) list; stays under SQLite's default host-parameter limit
+PRAGMAS = (
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+)
+# switching to WAL takes an exclusive lock that busy_timeout does not wait
+# for, so processes racing to set up the same fresh file retry it themselves
+WAL_RETRIES = 20
+
+# one connection per (thread, db path); sqlite3 connections must not be
+# shared between threads that use them concurrently. Each entry remembers the
+# identity of the file it opened so a rebuilt or replaced DB gets a fresh one.
+_pool: dict[tuple[int, str], tuple[sqlite3.Connection, tuple[int, int] | None]] = {}
+_pool_lock = threading.Lock()
+_opened = 0
+
+
+@profiling.timed("connect")
+def _connect(path: str, **kwargs) -> sqlite3.Connection:
+    global _opened
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, **kwargs)
+    with _pool_lock:
+        _opened += 1
+    profiling.count("connections opened")
+    return conn
 
 
 def get_connection(path: str) -> sqlite3.Connection:
+    """Open a private connection; the caller is responsible for closing it."""
+    conn = _connect(path)
+    if profiling.enabled():
+        profiling.watch(conn, pooled=False)
+    return conn
+
+
+def _identity(path: str) -> tuple[int, int] | None:
+    # an unlinked file stays open under its inode, so (dev, ino) cannot be
+    # reused while the old connection still holds it
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_dev, st.st_ino
+
+
+def _use_wal(conn: sqlite3.Connection, schema: str = "") -> None:
+    # WAL lets readers run alongside the writer; NORMAL only fsyncs at
+    # checkpoints, which is still durable against application crashes in WAL mode
+    for attempt in range(WAL_RETRIES):
+        try:
+            if conn.execute(f"PRAGMA {schema}journal_mode").fetchone()[0] != "wal":
+                conn.execute(f"PRAGMA {schema}journal_mode=WAL")
+            break
+        except sqlite3.OperationalError as e:
+            if attempt == WAL_RETRIES - 1 or not ("locked" in str(e) or "busy" in str(e)):
+                raise
+            time.sleep(0.01 * (attempt + 1))
+    conn.execute(f"PRAGMA {schema}synchronous=NORMAL")
+
+
+@contextmanager
+def pooled_connection(path: str):
+    """Yield this thread's shared connection to `path`, rolling back on error.
+
+    Callers commit as usual but must not close the connection; everything in
+    the pool is closed by close_all() at interpreter exit. If the file was
+    deleted or replaced since the connection was opened it is reopened, so a
+    long-running process never keeps reading an unlinked copy.
+    """
+    key = (threading.get_ident(), os.path.abspath(path))
+    entry = _pool.get(key)
+    if entry is not None and entry[1] != _identity(key[1]):
+        with _pool_lock:
+            _pool.pop(key, None)
+        try:
+            entry[0].close()
+        except sqlite3.Error:
+            pass
+        entry = None
+    if entry is None:
+        conn = _connect(path, cached_statements=CACHED_STATEMENTS, check_same_thread=False)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        _use_wal(conn)
+        with _pool_lock:
+            _pool[key] = conn, _identity(key[1])
+    else:
+        conn = entry[0]
+    if profiling.enabled():
+        profiling.watch(conn)
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def attach(conn: sqlite3.Connection, alias: str, path: str) -> None:
+    """ATTACH `path` as `alias` on a pooled connection unless it already is.
+
+    Must be called outside a transaction. One commit() then covers writes to
+    both files, but in WAL mode SQLite commits each file separately: a crash
+    part-way through can leave one committed and the other not. Writes that
+    must stay consistent across files need their own recovery, like the
+    history outbox in main._drain_history.
+    """
+    if any(row[1] == alias for row in conn.execute("PRAGMA database_list")):
+        return
     os.makedirs(os.path.dirname(path), exist_ok=True)
-    conn = sqlite3.connect(path)
-    conn.row_factory = sqlite3.Row
-    return conn
\ No newline at end of file
+    conn.execute("ATTACH DATABASE ? AS " + alias, (path,))
+    _use_wal(conn, alias + ".")
+
+
+def select_in(conn: sqlite3.Connection, sql: str, values, params=()):
+    """Yield the rows of `sql` for any number of `values`, one query per chunk.
+
+    `sql` marks where the IN list goes with {}, as in "... WHERE id IN ({})";
+    `params` are bound ahead of each chunk.
+    """
+    values = list(values)
+    for i in range(0, len(values), IN_CHUNK):
+        chunk = values[i : i + IN_CHUNK]
+        yield from conn.execute(sql.format(",".join("?" * len(chunk))), (*params, *chunk))
+
+
+def connections_opened() -> int:
+    """Number of SQLite connections opened by this process so far."""
+    return _opened
+
+
+def close_all() -> None:
+    with _pool_lock:
+        conns = [conn for conn, _ in _pool.values()]
+        _pool.clear()
+    for conn in conns:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+atexit.register(close_all)
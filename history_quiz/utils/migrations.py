@@ -0,0 +1,64 @@
+"""Ordered, in-place schema migrations tracked in PRAGMA user_version.
+
+A migration list is a sequence of (version, description, step) with strictly
+increasing versions; a DB at user_version N gets every step above N, each in
+its own BEGIN IMMEDIATE transaction together with the new user_version, so an
+interrupted upgrade resumes from the last completed step. Steps must change
+tables in place (CREATE, ALTER TABLE ... ADD COLUMN, CREATE INDEX, UPDATE),
+never copy a table into a new one: topic DBs can be large and are migrated on
+first open.
+"""
+from __future__ import annotations
+import sqlite3
+from collections.abc import Callable, Sequence
+
+# (version, description, step); collections.abc rather than typing, which
+# would add milliseconds to every CLI start
+Migration = tuple[int, str, Callable[[sqlite3.Connection], None]]
+
+
+def user_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def latest(migrations: Sequence[Migration]) -> int:
+    return migrations[-1][0] if migrations else 0
+
+
+def run_script(conn: sqlite3.Connection, script: str) -> None:
+    """Execute a multi-statement script inside the caller's transaction.
+
+    executescript() would commit first, so statements are split and run one
+    at a time.
+    """
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ""
+
+
+def migrate(conn: sqlite3.Connection, migrations: Sequence[Migration]) -> tuple[int, int]:
+    """Apply the pending steps in order; returns (version before, version after).
+
+    Must be called outside a transaction. A DB that is already current costs
+    one PRAGMA. Concurrent openers serialise on the write lock and skip steps
+    another process has applied in the meantime.
+    """
+    start = user_version(conn)
+    if start >= latest(migrations):
+        return start, start
+    for version, _, step in migrations:
+        if version <= start:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if user_version(conn) < version:
+                step(conn)
+                conn.execute(f"PRAGMA user_version={version}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    return start, user_version(conn)
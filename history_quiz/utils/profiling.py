@@ -0,0 +1,221 @@
+"""Opt-in timers and counters for the quiz hot paths.
+
+Functions decorated with @timed and blocks wrapped in span() are recorded as
+phases; connections opened or used while profiling is on count every SQL
+statement (via the trace callback) and every row fetched (via a pass-through
+row factory). When profiling is off a decorated call costs one extra function
+call and a global check, and connections are not touched.
+
+`history-quiz --profile <command>` prints the breakdown to stderr after the
+command; `--profile-format pstats|trace` (with `--profile-out PATH`) also
+saves cProfile stats or a Chrome trace. The GUI has the same under its
+Debug menu.
+"""
+from __future__ import annotations
+import os, threading, time
+from functools import wraps
+
+_on = False
+_lock = threading.Lock()
+_t0 = 0.0
+_phases: dict[str, list] = {}  # name -> [calls, total seconds]
+_counters: dict[str, int] = {}
+_statements: dict[str, int] = {}
+_events: list[tuple] = []  # (name, thread id, start, duration) for the trace
+_watched: set = set()  # pooled connections, reset on disable()
+
+MAX_EVENTS = 200_000
+STATEMENT_KEY = 80  # statements are grouped by their first characters
+
+
+def enabled() -> bool:
+    return _on
+
+
+def enable() -> None:
+    global _on, _t0
+    reset()
+    _t0 = time.perf_counter()
+    _on = True
+
+
+def disable() -> None:
+    global _on
+    _on = False
+    for conn in list(_watched):
+        try:
+            conn.set_trace_callback(None)
+            conn.row_factory = None
+        except Exception:  # closed since
+            pass
+    _watched.clear()
+
+
+def reset() -> None:
+    with _lock:
+        _phases.clear()
+        _counters.clear()
+        _statements.clear()
+        _events.clear()
+
+
+def count(name: str, n: int = 1) -> None:
+    if _on:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+
+def _record(name: str, start: float, elapsed: float) -> None:
+    with _lock:
+        phase = _phases.setdefault(name, [0, 0.0])
+        phase[0] += 1
+        phase[1] += elapsed
+        if len(_events) < MAX_EVENTS:
+            _events.append((name, threading.get_ident(), start, elapsed))
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _record(self.name, self.start, time.perf_counter() - self.start)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name: str):
+    """Context manager timing a block as phase `name`."""
+    return _Span(name) if _on else _NO_SPAN
+
+
+def timed(name: str):
+    """Decorator timing every call of a function as phase `name`."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _on:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _record(name, start, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorate
+
+
+def _trace(sql: str) -> None:
+    key = " ".join(sql.split())[:STATEMENT_KEY]
+    with _lock:
+        _statements[key] = _statements.get(key, 0) + 1
+
+
+def _count_row(cursor, row):
+    with _lock:
+        _counters["rows fetched"] = _counters.get("rows fetched", 0) + 1
+    return row
+
+
+def watch(conn, pooled: bool = True) -> None:
+    """Count statements and rows on `conn`; pooled connections stop when
+    profiling is disabled, private ones when they are closed."""
+    if conn in _watched:
+        return
+    conn.set_trace_callback(_trace)
+    conn.row_factory = _count_row
+    if pooled:
+        _watched.add(conn)
+
+
+# ---------- output ----------
+
+def report() -> str:
+    """Per-phase breakdown, counters and the most frequent statements."""
+    wall = (time.perf_counter() - _t0) * 1000
+    with _lock:
+        phases = sorted(_phases.items(), key=lambda kv: -kv[1][1])
+        counters = dict(_counters)
+        statements = sorted(_statements.items(), key=lambda kv: -kv[1])
+    counters["sql statements"] = sum(n for _, n in statements)
+    lines = [f"profile: {wall:.1f} ms since profiling started", f"{'phase':<24}  {'calls':>7}  {'total':>10}  {'mean':>10}"]
+    for name, (calls, total) in phases:
+        lines.append(f"{name:<24}  {calls:>7}  {total * 1000:>8.2f}ms  {total * 1000 / calls:>8.3f}ms")
+    lines.append("counters: " + ", ".join(f"{k}={v}" for k, v in sorted(counters.items())))
+    if statements:
+        lines.append("most frequent statements:")
+        lines.extend(f"  {n:>6}  {sql}" for sql, n in statements[:10])
+    return "\n".join(lines)
+
+
+def write_chrome_trace(path: str) -> int:
+    """Write recorded phases as Chrome trace events (chrome://tracing, Perfetto)."""
+    import json
+
+    pid = os.getpid()
+    with _lock:
+        events = [
+            {"name": name, "ph": "X", "pid": pid, "tid": tid,
+             "ts": (start - _t0) * 1e6, "dur": elapsed * 1e6}
+            for name, tid, start, elapsed in _events
+        ]
+        counters = dict(_counters, **{"sql statements": sum(_statements.values())})
+    events.append({"name": "counters", "ph": "C", "pid": pid, "ts": (time.perf_counter() - _t0) * 1e6, "args": counters})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return len(events)
+
+
+def run_profiled(fn, mode: str = "text", out: str | None = None):
+    """Run fn() with profiling on and print the breakdown to stderr.
+
+    mode "pstats" also runs cProfile and dumps it to `out`; "trace" writes a
+    Chrome trace to `out`.
+    """
+    import sys
+
+    enable()
+    profiler = None
+    if mode == "pstats":
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        return fn()
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        print(report(), file=sys.stderr)
+        if mode == "pstats":
+            import pstats
+
+            out = out or "history-quiz.pstats"
+            profiler.dump_stats(out)
+            pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(15)
+            print(f"cProfile stats written to {out}", file=sys.stderr)
+        elif mode == "trace":
+            out = out or "history-quiz-trace.json"
+            write_chrome_trace(out)
+            print(f"Chrome trace written to {out}", file=sys.stderr)
+        disable()